@@ -2,27 +2,179 @@
 # Streamlit App: Entry form → Dose calculations → Correction tables (40 mg bins)
 # → Bolus calculator → PDF Summary export
 
+import io
+import os
+import tempfile
+import time
+
 import streamlit as st
-import pandas as pd
-import math
-from io import BytesIO
-
-# Try to import reportlab for PDF export (installed via requirements.txt)
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import cm
-    REPORTLAB_OK = True
-except Exception:
-    REPORTLAB_OK = False
+
+from smart_insulin import (
+    BINS_40,
+    BOLUS_TYPES,
+    CATEGORIES,
+    CORRECTION_TYPES,
+    FACTORS,
+    REGIMEN_BY_NAME,
+    REGIMENS,
+    STEPS,
+    VISIT_TYPES,
+    TTLCache,
+    bolus_correction,
+    bolus_reference_rows,
+    build_prescription,
+    warm_correction_tables,
+)
+from smart_insulin import metrics, timing
+from smart_insulin.pdf import REPORTLAB_OK, build_pdf_summary
+from smart_insulin.pdf_batch import iter_prescriptions, write_zip
+from smart_insulin.pdf_cache import DiskPDFCache, pdf_cache_key
+from smart_insulin.render_queue import QueueFull, RenderQueue
+from smart_insulin.singleflight import SingleFlight
+
+# Correction tables for every TDD are built once per process and shared by all sessions
+warm_correction_tables()
+
+# Prometheus metrics endpoint (opt-in), e.g. SMART_INSULIN_METRICS_PORT=9464
+if os.environ.get("SMART_INSULIN_METRICS_PORT"):
+    metrics.start_server(int(os.environ["SMART_INSULIN_METRICS_PORT"]))
+
+# Render the PDF in the background right after submit (SMART_INSULIN_PDF_PRERENDER=0 to disable)
+PDF_PRERENDER = os.environ.get("SMART_INSULIN_PDF_PRERENDER", "1") != "0"
 
 # --------------------------- Page setup ---------------------------
 st.set_page_config(page_title="SMART Insulin Worksheet", page_icon="💉", layout="wide")
 st.title("SMART Insulin Worksheet — Developed by Dr Parimal Swamy")
 st.caption("Insulin dose calculator with regimen splits, 40 mg/dL correction bins, bolus tool, and PDF export.")
 
-def round_unit(x, step=0.5):
-    return step * round(float(x) / step)
+
+@st.cache_resource
+def table_cache():
+    # One cache per process, shared by every session (max 512 tables, 6 h TTL)
+    cache = TTLCache(max_entries=512, ttl=6 * 3600)
+    metrics.register_cache("tables", cache)
+    return cache
+
+
+def correction_frame(rx):
+    """DataFrame for the prescription's correction table, cached across sessions."""
+    def build():
+        import pandas as pd  # imported on first use, not at worker start
+
+        return pd.DataFrame(rx.correction_records())
+    return table_cache().get_or_compute(("worksheet", rx.tdd_half, rx.corr_type, rx.target, BINS_40), build)
+
+
+def bolus_reference_frame(bol_tdd, bol_type, isf):
+    """DataFrame for the bolus calculator reference table, cached across sessions."""
+    def build():
+        import pandas as pd
+
+        return pd.DataFrame(bolus_reference_rows(isf))
+    return table_cache().get_or_compute(("bolus", bol_tdd, bol_type, BINS_40), build)
+
+
+@st.cache_resource
+def pdf_cache():
+    # Rendered PDF bytes per input set, shared by every session (max 64 PDFs, 1 h TTL)
+    cache = TTLCache(max_entries=64, ttl=3600)
+    metrics.register_cache("pdf", cache)
+    return cache
+
+
+@st.cache_resource
+def pdf_disk_cache():
+    # Reprints across restarts and workers, opt-in: SMART_INSULIN_PDF_CACHE_DIR / _MB (default
+    # 256 MB). Off by default so worksheets (with patient names) are not written to disk.
+    directory = os.environ.get("SMART_INSULIN_PDF_CACHE_DIR")
+    if not directory:
+        return None
+    cache = DiskPDFCache(directory, max_bytes=int(os.environ.get("SMART_INSULIN_PDF_CACHE_MB", "256")) * 1024 * 1024)
+    metrics.register_cache("pdf_disk", cache)
+    return cache
+
+
+@st.cache_resource
+def pdf_flight():
+    # Concurrent requests for the same worksheet wait on one render and share its bytes
+    return SingleFlight()
+
+
+def pdf_job(rx):
+    """Zero-argument job producing PDF bytes for rx: memory cache → disk cache (if enabled) → one render.
+
+    Cache objects are resolved here, on the script thread, so the job can run on a worker.
+    """
+    mem, disk, flight = pdf_cache(), pdf_disk_cache(), pdf_flight()
+
+    def render():
+        return disk.get_or_render(rx, render_pdf) if disk is not None else render_pdf(rx)
+    return lambda: mem.get_or_compute(rx, lambda: flight.do(pdf_cache_key(rx), render))
+
+
+@st.cache_resource
+def render_queue():
+    # Background PDF renders: SMART_INSULIN_PDF_WORKERS running, SMART_INSULIN_PDF_QUEUE waiting
+    return RenderQueue(
+        workers=int(os.environ.get("SMART_INSULIN_PDF_WORKERS", "2")),
+        max_pending=int(os.environ.get("SMART_INSULIN_PDF_QUEUE", "16")),
+    )
+
+
+def pdf_section(rx, polling):
+    """PDF download; run as a fragment that polls while a background render is pending."""
+    st.subheader("Download PDF Summary")
+    if not REPORTLAB_OK:
+        st.warning("PDF export not available (reportlab not installed). Add 'reportlab' to requirements.txt.")
+        return
+    pdf_bytes = pdf_cache().peek(rx)  # no hit/miss counted: this runs on every poll and rerun
+    if pdf_bytes is not None:
+        if polling:
+            st.rerun()  # render finished: one full rerun switches polling off
+        st.download_button(
+            "🧾 Download PDF Summary",
+            data=pdf_bytes,
+            file_name=f"insulin_worksheet_{rx.pname or 'patient'}.pdf",
+            mime="application/pdf",
+        )
+        return
+    state = render_queue().state(rx)
+    if state in ("queued", "running"):
+        st.info("⏳ Preparing PDF summary…")
+        return
+    if state == "failed":
+        if polling:
+            st.rerun()  # render failed: one full rerun switches polling off
+        st.error(f"PDF render failed: {render_queue().error(rx)}")
+    if st.button("🧾 Prepare PDF Summary"):
+        try:
+            render_queue().submit(rx, pdf_job(rx))
+        except QueueFull:
+            st.warning("The PDF renderer is busy. Please try again in a moment.")
+        else:
+            st.rerun()  # full rerun so the section starts polling
+
+
+def session_memo(name, key, compute):
+    """Per-session memo: recompute only when this piece's inputs (key) change."""
+    slot = st.session_state.get(name)
+    if slot is None or slot[0] != key:
+        slot = (key, compute())
+        st.session_state[name] = slot
+    return slot[1]
+
+
+@timing.timed("build_pdf_summary")
+def render_pdf(rx):
+    pdf = build_pdf_summary(rx)
+    metrics.PDF_RENDERS.inc()
+    metrics.PDF_BYTES.observe(len(pdf))
+    return pdf
+
+
+# Per-stage rerun timings (no-op unless SMART_INSULIN_TIMING=1; see the admin latency page)
+laps = timing.laps()
+metrics.RERUNS.inc(section="worksheet")
 
 # --------------------------- ENTRY FORM ---------------------------
 with st.form("entry_form", clear_on_submit=False):
@@ -34,24 +186,19 @@ with st.form("entry_form", clear_on_submit=False):
     with colw2:
         category = st.radio(
             "2) Risk category",
-            ["Usual", "Hypoglycemia concern"],
+            list(CATEGORIES),
             index=0,
             help="Select 'Hypoglycemia concern' for elderly, renal/hepatic impairment, autonomic neuropathy, erratic meals",
         )
         factor = st.select_slider(
-            "3) Dose selection (units/kg)", options=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6], value=0.3
+            "3) Dose selection (units/kg)", options=list(FACTORS), value=0.3
         )
 
     st.markdown("---")
     st.subheader("Visit Context")
     visit = st.selectbox(
         "4) Visit type",
-        [
-            "Initial prescription",
-            "Repeat prescription (with previous TDD)",
-            "Inadequate control (with previous TDD)",
-            "Hypoglycemia (with previous TDD)",
-        ],
+        list(VISIT_TYPES),
         index=0,
     )
 
@@ -65,21 +212,30 @@ with st.form("entry_form", clear_on_submit=False):
     st.subheader("Regimen Choice")
     regimen = st.radio(
         "5) Choose regimen",
-        [
-            "Basal",
-            "Basal plus (one prandial)",
-            "Premixed — twice a day",
-            "Premixed — three times a day",
-            "Basal bolus",
-        ],
+        list(REGIMENS),
         index=0,
     )
 
     submitted = st.form_submit_button("Save & Continue")
 
-# --------------------------- COMPUTE AND DISPLAY DOSING ---------------------------
+# Keep the submitted entry so downstream controls (step slider, correction type)
+# can rerun the script without wiping the results or needing a resubmit
 if submitted:
-    st.success("Entry captured.")
+    st.session_state["entry"] = dict(
+        pname=pname, wt=wt, category=category, factor=factor, visit=visit, prev_tdd=prev_tdd, regimen=regimen
+    )
+    metrics.REGIMENS.inc(regimen=regimen)
+laps.mark("entry_form")
+
+# --------------------------- COMPUTE AND DISPLAY DOSING ---------------------------
+entry = st.session_state.get("entry")
+if entry is not None:
+    pname, wt, category, factor, visit, prev_tdd, regimen = (
+        entry[k] for k in ("pname", "wt", "category", "factor", "visit", "prev_tdd", "regimen")
+    )
+    metrics.RERUNS.inc(section="results")
+    if submitted:
+        st.success("Entry captured.")
     st.write(
         {
             "patient": pname,
@@ -95,30 +251,35 @@ if submitted:
     st.markdown("---")
     st.header("Compute Doses from Entry")
 
-    # Targets
-    target = 130 if category == "Usual" else 140
-
-    # Base TDD from weight & factor
-    tdd_base = wt * factor
-
-    # Visit logic for TDD
-    adj_note = ""
-    if visit == "Initial prescription":
-        tdd = tdd_base
-        adj_note = "Initial: TDD = weight × factor"
-    elif visit == "Repeat prescription (with previous TDD)":
-        tdd = prev_tdd or tdd_base
-        adj_note = "Repeat: using previous TDD"
-    elif visit == "Inadequate control (with previous TDD)":
-        step = st.select_slider("Escalation step", options=[10, 15, 20], value=15)
-        tdd = (prev_tdd or tdd_base) * (1 + step / 100)
-        adj_note = f"Escalation: +{step}% applied to previous TDD"
-    else:  # Hypoglycemia (with previous TDD)
-        step = st.select_slider("De-escalation step", options=[10, 15, 20], value=15)
-        tdd = (prev_tdd or tdd_base) * (1 - step / 100)
-        adj_note = f"De-escalation: -{step}% applied to previous TDD"
-
-    tdd = round_unit(tdd)
+    # Visit logic for TDD (escalation / de-escalation step chosen on screen)
+    step = 15
+    if visit == "Inadequate control (with previous TDD)":
+        step = st.select_slider("Escalation step", options=list(STEPS), value=15)
+    elif visit == "Hypoglycemia (with previous TDD)":
+        step = st.select_slider("De-escalation step", options=list(STEPS), value=15)
+    # The correction type radio is drawn further down; its keyed value is already known here
+    corr_type = st.session_state.get("corr_type", CORRECTION_TYPES[0])
+
+    # One immutable prescription per input set, shared by the screen and the PDF
+    try:
+        rx = session_memo(
+            "rx",
+            (pname, wt, category, factor, visit, prev_tdd, regimen, step, corr_type),
+            lambda: build_prescription(pname, wt, category, factor, visit, prev_tdd, regimen, step, corr_type),
+        )
+    except ValueError as exc:
+        st.error(str(exc))
+        st.stop()
+    tdd, target, doses = rx.tdd, rx.target, rx.dose_map
+
+    # Inputs are final on submit: start the PDF render in the background while the doses
+    # are reviewed, so the download is ready when clicked (best effort: skipped unless the
+    # queue has spare capacity beyond the slots reserved for "Prepare PDF Summary" clicks)
+    if submitted and PDF_PRERENDER and REPORTLAB_OK and rx not in pdf_cache():
+        try:
+            render_queue().submit(rx, pdf_job(rx), background=True)
+        except QueueFull:
+            pass
 
     col0, col1, col2, col3 = st.columns(4)
     with col0:
@@ -126,224 +287,133 @@ if submitted:
     with col1:
         st.metric("Dose factor (U/kg)", f"{factor}")
     with col2:
-        st.metric("TDD (units)", f"{tdd}", help=adj_note)
+        st.metric("TDD (units)", f"{tdd}", help=rx.adj_note)
     with col3:
         st.metric("Pre-meal goal", f"≤ {target} mg/dL")
 
+    laps.mark("tdd")
+
     st.subheader("Regimen-specific Doses")
 
-    if regimen == "Basal":
-        st.markdown("**Basal (long-acting)**: start **10 U** _or_ **0.1–0.2 U/kg** after dinner")
-        st.markdown(f"Weight-based range: **{round_unit(0.1*wt)}–{round_unit(0.2*wt)} U**")
-        st.caption("Titrate ↑2 U every 3 days if fasting >130 mg/dL (or >140 mg/dL if hypoglycemia concern).")
-    elif regimen == "Basal plus (one prandial)":
-        st.markdown(
-            "**Basal:** 10 U or 0.1–0.2 U/kg at bedtime; **One prandial:** 0.1 U/kg before largest meal"
-        )
-        st.markdown(
-            f"Basal range: **{round_unit(0.1*wt)}–{round_unit(0.2*wt)} U** | One prandial: **{round_unit(0.1*wt)} U**"
-        )
-    elif regimen == "Premixed — twice a day":
-        st.markdown(
-            f"**Premix TDD = {tdd} U** → **2/3 breakfast:** {round_unit(tdd*2/3)} U, "
-            f"**1/3 supper:** {round_unit(tdd*1/3)} U"
-        )
-    elif regimen == "Premixed — three times a day":
-        st.markdown(
-            f"**Premix TDD = {tdd} U** → **40% breakfast:** {round_unit(tdd*0.40)} U, "
-            f"**30% lunch:** {round_unit(tdd*0.30)} U, **30% dinner:** {round_unit(tdd*0.30)} U"
-        )
-    else:  # Basal bolus
-        st.markdown(
-            f"**Basal-bolus TDD = {tdd} U** → **Basal 50%:** {round_unit(tdd*0.50)} U; "
-            f"**Bolus total 50%:** {round_unit(tdd*0.50)} U"
-        )
-        st.markdown(f"≈ **{round_unit((tdd*0.50)/3)} U** before each meal")
+    spec = REGIMEN_BY_NAME[regimen]
+    for line in spec.screen:
+        st.markdown(line.format(tdd=tdd, **doses))
+    if spec.caption:
+        st.caption(spec.caption)
+    laps.mark("regimen")
 
     st.markdown("---")
     st.subheader("Correction Doses (real units; fixed 40 mg/dL bins)")
 
-    corr_type = st.radio(
-        "Correction insulin type", ["Rapid analogue (1800/TDD)", "Regular (1500/TDD)"], index=0, horizontal=True
+    st.radio("Correction insulin type", list(CORRECTION_TYPES), index=0, horizontal=True, key="corr_type")
+    st.dataframe(correction_frame(rx), use_container_width=True)
+    st.caption(f"Correction factor: **1 U ≈ {rx.cf:.0f} mg/dL** ({corr_type}).")
+    laps.mark("correction_table")
+
+    # --------------------------- PDF Summary (on demand) ---------------------------
+    # Rendered on the background queue only when asked for; bytes cached per prescription
+    polling = REPORTLAB_OK and render_queue().state(rx) in ("queued", "running")
+    st.fragment(pdf_section, run_every=1.0 if polling else None)(rx, polling)
+
+# --------------------------- BOLUS CORRECTION CALCULATOR ---------------------------
+# Runs as a fragment: its widgets rerun only this function (ISF math + reference table),
+# not the worksheet above or the PDF export.
+@st.fragment
+@timing.timed("bolus_calculator")
+def bolus_calculator():
+    metrics.RERUNS.inc(section="bolus")
+    st.markdown("---")
+    st.header("Bolus Correction Calculator")
+
+    st.write(
+        "Estimate the **correctional insulin dose** for a given pre-meal glucose value, "
+        "based on the chosen insulin type and TDD. (Result is **added** to the scheduled pre-meal bolus.)"
     )
-    cf = (1800.0 / tdd) if "Rapid" in corr_type else (1500.0 / tdd)
-
-    # Fixed 40 mg/dL bins
-    bins_40 = [(131, 170), (171, 210), (211, 250), (251, 290), (291, 330)]
-    rows = []
-    for lo, hi in bins_40:
-        delta = max(0, lo - target)
-        units_usual = max(1, int(math.ceil(delta / cf)))
-        units_hypo = max(0, units_usual - 1)
-        rows.append(
-            {
-                "Pre-meal (mg/dL)": f"{lo}-{hi}",
-                "Usual (≤130) U": units_usual,
-                "Hypo-concern (≤140) U": units_hypo,
-            }
-        )
-    # >330 row with safety bump
-    delta = max(0, 331 - target)
-    units_usual = max(1, int(math.ceil(delta / cf))) + 5
-    units_hypo = max(0, units_usual - 1)
-    rows.append({"Pre-meal (mg/dL)": ">330", "Usual (≤130) U": units_usual, "Hypo-concern (≤140) U": units_hypo})
 
-    df_corr = pd.DataFrame(rows)
-    st.dataframe(df_corr, use_container_width=True)
-    st.caption(f"Correction factor: **1 U ≈ {cf:.0f} mg/dL** ({corr_type}).")
+    bol_tdd = st.number_input("Enter Total Daily Dose (TDD) (units)", min_value=5.0, max_value=300.0, value=50.0, step=0.5)
+    bol_type = st.radio("Type of Bolus Insulin", list(BOLUS_TYPES), horizontal=True)
+    premeal_bs = st.number_input("Pre-meal Blood Sugar (mg/dL)", min_value=60, max_value=600, value=180)
 
-    # --------------------------- PDF Summary ---------------------------
-    st.subheader("Download PDF Summary")
-    if REPORTLAB_OK:
-        def build_pdf_summary():
-            buf = BytesIO()
-            c = canvas.Canvas(buf, pagesize=A4)
-            w, h = A4
-            y = h - 2 * cm
-
-            # Header
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(2 * cm, y, "SMART Insulin Worksheet — Developed by Dr Parimal Swamy")
-            y -= 0.8 * cm
-            c.setFont("Helvetica", 10)
-            c.drawString(2 * cm, y, f"Patient: {pname or '—'}   Weight: {wt:.1f} kg   Category: {category}")
-            y -= 0.5 * cm
-            c.drawString(2 * cm, y, f"Visit: {visit}   Factor: {factor} U/kg   TDD: {tdd} U   Goal: ≤ {target} mg/dL")
-            y -= 0.7 * cm
-
-            # Regimen section
-            c.setFont("Helvetica-Bold", 11)
-            c.drawString(2 * cm, y, "Regimen-specific Doses")
-            y -= 0.5 * cm
-            c.setFont("Helvetica", 10)
-            if regimen == "Basal":
-                c.drawString(
-                    2 * cm,
-                    y,
-                    f"Basal (long-acting): 10 U or 0.1–0.2 U/kg after dinner "
-                    f"(range {round(0.1 * wt, 1)}–{round(0.2 * wt, 1)} U)",
-                )
-                y -= 0.5 * cm
-            elif regimen == "Basal plus (one prandial)":
-                c.drawString(
-                    2 * cm, y, f"Basal 0.1–0.2 U/kg; One prandial 0.1 U/kg → {round(0.1 * wt, 1)} U before largest meal"
-                )
-                y -= 0.5 * cm
-            elif regimen == "Premixed — twice a day":
-                c.drawString(
-                    2 * cm,
-                    y,
-                    f"Premix TDD {tdd} U → Breakfast (2/3): {round(tdd * 2 / 3, 1)} U; "
-                    f"Supper (1/3): {round(tdd * 1 / 3, 1)} U",
-                )
-                y -= 0.5 * cm
-            elif regimen == "Premixed — three times a day":
-                c.drawString(
-                    2 * cm,
-                    y,
-                    f"Premix TDD {tdd} U → 40% BF: {round(tdd * 0.40, 1)} U; 30% L: {round(tdd * 0.30, 1)} U; "
-                    f"30% D: {round(tdd * 0.30, 1)} U",
-                )
-                y -= 0.5 * cm
-            else:
-                c.drawString(
-                    2 * cm,
-                    y,
-                    f"Basal-bolus TDD {tdd} U → Basal 50%: {round(tdd * 0.50, 1)} U; "
-                    f"Bolus total 50%: {round(tdd * 0.50, 1)} U (~{round((tdd * 0.50) / 3, 1)} U each)",
-                )
-                y -= 0.5 * cm
-
-            # Correction table header
-            y -= 0.2 * cm
-            c.setFont("Helvetica-Bold", 11)
-            c.drawString(2 * cm, y, f"Correction doses ({corr_type}; 1 U ≈ {cf:.0f} mg/dL; bins 40 mg/dL)")
-            y -= 0.5 * cm
-            c.setFont("Helvetica", 10)
-            # Render df_corr rows
-            for _, r in df_corr.iterrows():
-                if y < 2.5 * cm:
-                    c.showPage()
-                    y = h - 2 * cm
-                    c.setFont("Helvetica", 10)
-                c.drawString(
-                    2 * cm,
-                    y,
-                    f"{r['Pre-meal (mg/dL)']}: Usual {int(r['Usual (≤130) U'])} U | "
-                    f"Hypo {int(r['Hypo-concern (≤140) U'])} U",
-                )
-                y -= 0.4 * cm
-
-            # Footer
-            if y < 2.5 * cm:
-                c.showPage()
-                y = h - 2 * cm
-            c.setFont("Helvetica-Oblique", 9)
-            c.drawString(
-                2 * cm,
-                1.9 * cm,
-                "Add correction dose to scheduled pre-meal bolus. Adjust for renal/hepatic status; "
-                "check ketones if >330 mg/dL or symptomatic.",
-            )
-            c.drawString(2 * cm, 1.4 * cm, "Signature: _______________________    Date: __/__/____")
-            c.save()
-            pdf = buf.getvalue()
-            buf.close()
-            return pdf
+    isf, units_usual, units_hypo = bolus_correction(bol_tdd, bol_type, premeal_bs)
 
-        pdf_bytes = build_pdf_summary()
-        st.download_button(
-            "🧾 Download PDF Summary",
-            data=pdf_bytes,
-            file_name=f"insulin_worksheet_{pname or 'patient'}.pdf",
-            mime="application/pdf",
-        )
-    else:
-        st.warning("PDF export not available (reportlab not installed). Add 'reportlab' to requirements.txt.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Usual Protocol (target ≤130)", f"{units_usual} units")
+    with col2:
+        st.metric("Hypoglycemia-prone (target ≤140)", f"{units_hypo} units")
 
-# --------------------------- BOLUS CORRECTION CALCULATOR ---------------------------
-st.markdown("---")
-st.header("Bolus Correction Calculator")
+    st.info("This correction dose is **added to the scheduled pre-meal insulin bolus** before the meal.")
+    st.caption(f"Insulin Sensitivity Factor (ISF): 1 unit lowers ≈ {isf:.0f} mg/dL")
 
-st.write(
-    "Estimate the **correctional insulin dose** for a given pre-meal glucose value, "
-    "based on the chosen insulin type and TDD. (Result is **added** to the scheduled pre-meal bolus.)"
-)
+    st.subheader("Reference: Correction Table by Range (Fixed 40 mg/dL bins)")
+    st.dataframe(bolus_reference_frame(bol_tdd, bol_type, isf), use_container_width=True)
+
+
+bolus_calculator()
+
+
+# --------------------------- BATCH WORKSHEETS (ZIP) ---------------------------
+# One PDF per roster patient, streamed into a ZIP on disk as each one is rendered
+# (never all PDFs in memory while rendering); the finished ZIP is read once for the
+# download and deleted. A fragment, so it reruns on its own.
+# Rendered on threads, not processes: a spawned worker would re-execute this script.
+BATCH_ZIP_DIR = os.path.join(tempfile.gettempdir(), "smart_insulin_batch")
+BATCH_ZIP_MAX_AGE = 3600  # seconds; ZIPs hold patient names, ones left by a killed build are swept
+
+
+def sweep_batch_zips(max_age=BATCH_ZIP_MAX_AGE):
+    """Delete batch ZIPs older than max_age (left behind when a build was killed mid-way)."""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(BATCH_ZIP_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+@st.fragment
+def batch_worksheets():
+    st.markdown("---")
+    st.header("Batch Worksheets (ZIP)")
+    if not REPORTLAB_OK:
+        st.warning("PDF export not available (reportlab not installed). Add 'reportlab' to requirements.txt.")
+        return
+
+    roster = st.file_uploader(
+        "Roster CSV (name, weight, category, factor, visit, prev_tdd, regimen)", type="csv"
+    )
+    if roster is not None and st.button("📦 Build worksheet ZIP"):
+        os.makedirs(BATCH_ZIP_DIR, mode=0o700, exist_ok=True)
+        sweep_batch_zips()
+        fd, path = tempfile.mkstemp(prefix="insulin_worksheets_", suffix=".zip", dir=BATCH_ZIP_DIR)
+        os.close(fd)
+        status = st.empty()
+        try:
+            count = write_zip(
+                iter_prescriptions(io.TextIOWrapper(roster, encoding="utf-8", newline="")),
+                path,
+                workers=2,
+                progress=lambda n: status.caption(f"Rendered {n} worksheets…"),
+                threads=True,
+            )
+            # The download button holds its bytes in memory anyway: read the ZIP once, here,
+            # and delete it, instead of re-reading and re-hashing it on every later rerun
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except (KeyError, ValueError) as exc:
+            st.error(f"Roster error: {exc}")
+            return
+        finally:
+            os.remove(path)
+        st.download_button(
+            f"🧾 Download {count} worksheets (ZIP)",
+            data=data,
+            file_name="insulin_worksheets.zip",
+            mime="application/zip",
+        )
+        st.caption("The download is offered once; build the ZIP again to download it again.")
 
-bol_tdd = st.number_input("Enter Total Daily Dose (TDD) (units)", min_value=5.0, max_value=300.0, value=50.0, step=0.5)
-bol_type = st.radio("Type of Bolus Insulin", ["Regular (1500/TDD)", "Rapid Acting (1800/TDD)"], horizontal=True)
-premeal_bs = st.number_input("Pre-meal Blood Sugar (mg/dL)", min_value=60, max_value=600, value=180)
-
-isf = 1500 / bol_tdd if "Regular" in bol_type else 1800 / bol_tdd
-units_usual = 0 if premeal_bs <= 130 else math.ceil((premeal_bs - 130) / isf)
-units_hypo = 0 if premeal_bs <= 140 else math.ceil((premeal_bs - 140) / isf)
-
-col1, col2 = st.columns(2)
-with col1:
-    st.metric("Usual Protocol (target ≤130)", f"{units_usual} units")
-with col2:
-    st.metric("Hypoglycemia-prone (target ≤140)", f"{units_hypo} units")
-
-st.info("This correction dose is **added to the scheduled pre-meal insulin bolus** before the meal.")
-st.caption(f"Insulin Sensitivity Factor (ISF): 1 unit lowers ≈ {isf:.0f} mg/dL")
-
-st.subheader("Reference: Correction Table by Range (Fixed 40 mg/dL bins)")
-ref_buckets = [(131, 170), (171, 210), (211, 250), (251, 290), (291, 330)]
-rows_ref = []
-for lo, hi in ref_buckets:
-    delta_usual = max(0, lo - 130)
-    delta_hypo = max(0, lo - 140)
-    u_usual = max(1, int(math.ceil(delta_usual / isf)))
-    u_hypo = max(0, int(math.ceil(delta_hypo / isf)))
-    rows_ref.append({"Pre-meal (mg/dL)": f"{lo}-{hi}", "Usual (≤130) U": u_usual, "Hypo-prone (≤140) U": u_hypo})
-delta_usual = max(0, 331 - 130)
-delta_hypo = max(0, 331 - 140)
-rows_ref.append(
-    {
-        "Pre-meal (mg/dL)": ">330",
-        "Usual (≤130) U": max(1, int(math.ceil(delta_usual / isf))) + 5,
-        "Hypo-prone (≤140) U": max(0, int(math.ceil(delta_hypo / isf))) + 4,
-    }
-)
 
-st.dataframe(pd.DataFrame(rows_ref), use_container_width=True)
+batch_worksheets()
+laps.total("rerun")
@@ -0,0 +1,61 @@
+# SMART Insulin Worksheet — cold-start budget
+# Times imports in fresh interpreters (median of N runs) and fails if any module
+# with a budget exceeds it. Modules without a budget are reported for reference.
+#
+#   python benchmarks/cold_start.py [--runs 7]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> budget in ms (None = report only)
+BUDGETS = {
+    "smart_insulin": 50.0,
+    "smart_insulin.pdf": 50.0,
+    "streamlit": None,
+    "pandas": None,
+    "reportlab.pdfgen.canvas": None,
+}
+
+_SNIPPET = "import time; t = time.perf_counter(); import {mod}; print((time.perf_counter() - t) * 1000)"
+
+
+def import_ms(module, runs=7):
+    """Median import time of module (ms) in fresh interpreters, or None if not installed."""
+    times = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(mod=module)], cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            return None
+        times.append(float(proc.stdout.strip()))
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import budget check")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, budget in BUDGETS.items():
+        ms = import_ms(module, args.runs)
+        if ms is None:
+            print(f"{module:<28} not installed")
+            continue
+        status = ""
+        if budget is not None:
+            status = "ok" if ms <= budget else "OVER BUDGET"
+            failed |= ms > budget
+            status = f"(budget {budget:.0f} ms) {status}"
+        print(f"{module:<28} {ms:8.1f} ms  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# SMART Insulin Worksheet — API load test
+# Hammers a running local API instance with concurrent requests and reports
+# throughput and latency percentiles.
+#
+#   python -m smart_insulin.api --port 8600 &
+#   python benchmarks/load_test.py --url http://127.0.0.1:8600 --concurrency 64 --duration 10
+#   python benchmarks/load_test.py --stream 500000    # one bulk NDJSON request instead
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_insulin import REGIMENS, VISIT_TYPES as VISITS  # noqa: E402
+
+
+def payloads(seed=0):
+    """Endless mix of requests across all endpoints."""
+    rng = random.Random(seed)
+    while True:
+        wt = round(rng.uniform(40, 150) * 2) / 2
+        yield "/tdd", {"weight": wt, "factor": rng.choice([0.2, 0.3, 0.4]), "visit": rng.choice(VISITS),
+                       "prev_tdd": 40.0, "step": rng.choice([10, 15, 20])}
+        yield "/regimen", {"regimen": rng.choice(REGIMENS), "weight": wt, "tdd": round(wt * 0.3 * 2) / 2}
+        yield "/correction-table", {"tdd": round(wt * 0.3 * 2) / 2, "category": "Usual"}
+        yield "/bolus", {"tdd": 50.0, "bolus_type": "Regular (1500/TDD)", "premeal_bs": rng.randint(80, 400)}
+        yield "/prescription", {"name": "load", "weight": wt, "category": "Usual", "factor": 0.3,
+                                "visit": "Initial prescription", "regimen": rng.choice(REGIMENS)}
+
+
+async def worker(session, base, source, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        path, body = next(source)
+        t0 = time.perf_counter()
+        async with session.post(base + path, json=body) as resp:
+            await resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(base, concurrency, duration):
+    latencies, errors = [], []
+    source = payloads()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(
+            *(worker(session, base, source, deadline, latencies, errors) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+async def stream(base, n):
+    """Send n patients as one NDJSON body (generated on the fly) and count result lines."""
+    async def body():
+        source = (b for path, b in payloads() if path == "/prescription")
+        chunk = []
+        for i in range(n):
+            chunk.append(json.dumps(next(source)))
+            if len(chunk) == 1000 or i == n - 1:
+                yield ("\n".join(chunk) + "\n").encode("utf-8")
+                chunk = []
+
+    lines = errors = 0
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.post(base + "/prescriptions/stream", data=body()) as resp:
+            async for line in resp.content:
+                lines += 1
+                errors += b'"error"' in line
+    return lines, errors, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the SMART Insulin Worksheet API")
+    parser.add_argument("--url", default="http://127.0.0.1:8600")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--stream", type=int, default=0, help="send this many patients to the NDJSON endpoint")
+    args = parser.parse_args(argv)
+
+    if args.stream:
+        lines, errors, elapsed = asyncio.run(stream(args.url.rstrip("/"), args.stream))
+        print(f"streamed   {lines} results in {elapsed:.1f} s  ({lines / elapsed:,.0f} patients/s), {errors} errors")
+        return
+
+    latencies, errors, elapsed = asyncio.run(run(args.url.rstrip("/"), args.concurrency, args.duration))
+    if not latencies:
+        print("no requests completed")
+        return
+    q = statistics.quantiles(latencies, n=100)
+    print(f"requests   {len(latencies)} in {elapsed:.1f} s  ({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"errors     {len(errors)}")
+    print(f"latency    p50 {q[49] * 1000:.2f} ms   p95 {q[94] * 1000:.2f} ms   p99 {q[98] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
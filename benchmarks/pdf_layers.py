@@ -0,0 +1,68 @@
+# SMART Insulin Worksheet — PDF template layer benchmark
+# Compares worksheets drawn with the static header/footer stamped as form XObjects
+# (layers) against drawing them inline: render time and file size, for single PDFs
+# and for one combined multi-patient document.
+#
+#   python benchmarks/pdf_layers.py [--patients 200] [--rounds 4]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_insulin import REGIMENS, build_prescription  # noqa: E402
+from smart_insulin.pdf import build_pdf_summary, write_combined_pdf  # noqa: E402
+
+
+def roster(n):
+    return [
+        build_prescription(f"P{i:04d}", 50.0 + i % 60, "Usual", 0.3, "Initial prescription", None, REGIMENS[i % 5])
+        for i in range(n)
+    ]
+
+
+def single(prescriptions, layers):
+    t0 = time.perf_counter()
+    size = sum(len(build_pdf_summary(rx, layers)) for rx in prescriptions)
+    return (time.perf_counter() - t0) / len(prescriptions), size / len(prescriptions)
+
+
+def combined(prescriptions, layers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "combined.pdf")
+        t0 = time.perf_counter()
+        write_combined_pdf(prescriptions, path, layers=layers)
+        elapsed = time.perf_counter() - t0
+        return elapsed / len(prescriptions), os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF template layer benchmark")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=4, help="alternating rounds per variant (best is kept)")
+    args = parser.parse_args(argv)
+    prescriptions = roster(args.patients)
+
+    # Warm reportlab (imports, font metrics) so neither variant pays for it, then
+    # alternate the order over several rounds and keep each variant's best time
+    single(prescriptions[:20], layers=False)
+    single(prescriptions[:20], layers=True)
+
+    for label, fn, unit in (("single PDF", single, "bytes/PDF"), ("combined PDF", combined, "bytes total")):
+        best = {}
+        for round_i in range(args.rounds):
+            for layers in (False, True) if round_i % 2 == 0 else (True, False):
+                t, b = fn(prescriptions, layers=layers)
+                best[layers] = min(best.get(layers, (t, b)), (t, b))
+        inline_t, inline_b = best[False]
+        layer_t, layer_b = best[True]
+        print(f"{label:<13} inline  {inline_t * 1000:7.2f} ms/patient  {inline_b:10,.0f} {unit}")
+        print(f"{'':<13} layers  {layer_t * 1000:7.2f} ms/patient  {layer_b:10,.0f} {unit}"
+              f"  ({layer_t / inline_t - 1:+.0%} time, {layer_b / inline_b - 1:+.0%} size)")
+
+
+if __name__ == "__main__":
+    main()
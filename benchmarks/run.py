@@ -0,0 +1,221 @@
+# SMART Insulin Worksheet — benchmark suite
+# Times every hot path of the worksheet and compares against stored baselines.
+#
+#   python benchmarks/run.py                    # run and compare with baseline.json
+#   python benchmarks/run.py --save-baseline    # store current timings as the baseline
+#   python benchmarks/run.py --only tdd         # run benchmarks whose name contains "tdd"
+#
+# Exit code 1 if any benchmark is slower than baseline × threshold (default 1.25).
+# Benchmarks whose optional dependency (numpy, reportlab, streamlit) is missing are skipped.
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> (setup, calls per timing loop, gated); setup returns the zero-argument callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name, number=1000, gated=True):
+    """Register a benchmark; gated=False ones are reported but never baselined or compared."""
+    def deco(setup):
+        BENCHMARKS[name] = (setup, number, gated)
+        return setup
+    return deco
+
+
+# --------------------------- Engine (pure Python) ---------------------------
+@benchmark("round_unit", number=100_000)
+def _round_unit():
+    from smart_insulin import round_unit
+    return lambda: round_unit(47.3)
+
+
+@benchmark("tdd_scalar", number=100_000)
+def _tdd_scalar():
+    from smart_insulin import compute_tdd
+    return lambda: compute_tdd(70.0, 0.3, "Inadequate control (with previous TDD)", 40.0, 15)
+
+
+@benchmark("regimen_splits", number=20_000)
+def _regimen_splits():
+    from smart_insulin import REGIMENS, regimen_doses
+
+    def run():
+        for regimen in REGIMENS:
+            regimen_doses(regimen, 70.0, 42.0)
+    return run
+
+
+@benchmark("correction_table_compute", number=20_000)
+def _correction_table_compute():
+    from smart_insulin import correction_table
+    return lambda: correction_table(42.0, "Rapid analogue (1800/TDD)", 130)
+
+
+@benchmark("correction_table_lookup", number=20_000)
+def _correction_table_lookup():
+    from smart_insulin import lookup_correction_table, warm_correction_tables
+    warm_correction_tables()
+    return lambda: lookup_correction_table(42.0, "Rapid analogue (1800/TDD)", 130)
+
+
+@benchmark("bolus_isf", number=20_000)
+def _bolus_isf():
+    from smart_insulin import bolus_correction, bolus_reference_rows
+
+    def run():
+        isf, _, _ = bolus_correction(50.0, "Regular (1500/TDD)", 180)
+        bolus_reference_rows(isf)
+    return run
+
+
+# --------------------------- Batch (numpy) ---------------------------
+@benchmark("tdd_batch_100k", number=3)
+def _tdd_batch():
+    import numpy as np
+    from smart_insulin import VISIT_TYPES
+    from smart_insulin.batch import compute_tdd_batch
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    wt = rng.uniform(40, 150, n).round(1)
+    factor = rng.choice([0.1, 0.2, 0.3, 0.4, 0.5, 0.6], n)
+    visit = rng.integers(0, len(VISIT_TYPES), n)
+    prev = rng.uniform(10, 120, n).round(1)
+    step = rng.choice([10, 15, 20], n)
+    return lambda: compute_tdd_batch(wt, factor, visit, prev, step)
+
+
+@benchmark("regimen_batch_100k", number=3)
+def _regimen_batch():
+    import numpy as np
+    from smart_insulin import REGIMEN_TABLE
+    from smart_insulin.batch import regimen_doses_batch
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    regimen = rng.integers(0, len(REGIMEN_TABLE), n)
+    wt = rng.uniform(40, 150, n).round(1)
+    tdd = (rng.uniform(5, 150, n) * 2).round() / 2
+    return lambda: regimen_doses_batch(regimen, wt, tdd)
+
+
+# --------------------------- PDF (reportlab) ---------------------------
+@benchmark("build_pdf_summary", number=20)
+def _build_pdf_summary():
+    import reportlab  # noqa: F401  (skip cleanly when missing)
+    from smart_insulin import build_prescription
+    from smart_insulin.pdf import build_pdf_summary
+
+    rx = build_prescription("Bench", 70.0, "Usual", 0.3, "Initial prescription", None, "Basal bolus")
+    return lambda: build_pdf_summary(rx)
+
+
+@benchmark("build_prescription", number=20_000)
+def _build_prescription():
+    from smart_insulin import build_prescription, warm_correction_tables
+    warm_correction_tables()
+    return lambda: build_prescription(
+        "Bench", 70.0, "Usual", 0.3, "Inadequate control (with previous TDD)", 40.0, "Basal bolus", 15
+    )
+
+
+# --------------------------- Process / app level ---------------------------
+# Subprocess timing is too noisy for a ratio gate; cold_start.py enforces an absolute budget.
+@benchmark("cold_import_smart_insulin", number=1, gated=False)
+def _cold_import():
+    from cold_start import import_ms
+    # Timed in a subprocess; report the measured import time itself (seconds)
+    return lambda: import_ms("smart_insulin", runs=1) / 1000
+
+
+@benchmark("app_rerun", number=5)
+def _app_rerun():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30)
+    at.run()
+    at.button[0].click().run()  # "Save & Continue"
+    return lambda: at.run()
+
+
+# --------------------------- Runner ---------------------------
+def run_one(name, repeat=5):
+    """Best per-call time (seconds) for one benchmark, or None if skipped."""
+    setup, number, _ = BENCHMARKS[name]
+    try:
+        fn = setup()
+    except ImportError as exc:
+        print(f"{name:<28} skipped ({exc.name or exc} not installed)")
+        return None
+    if name.startswith("cold_import"):
+        best = min(fn() for _ in range(repeat))
+    else:
+        best = min(timeit.Timer(fn).repeat(repeat=repeat, number=number)) / number
+    return best
+
+
+def _fmt(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.2f} µs"
+    return f"{seconds * 1e3:9.2f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SMART Insulin Worksheet benchmarks")
+    parser.add_argument("--only", default="", help="run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown vs baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+
+    results = {}
+    regressions = []
+    for name in BENCHMARKS:
+        if args.only not in name:
+            continue
+        best = run_one(name, args.repeat)
+        if best is None:
+            continue
+        gated = BENCHMARKS[name][2]
+        if gated:
+            results[name] = best
+        base = baseline.get(name)
+        note = "no baseline" if gated else "not gated (see cold_start.py)"
+        if gated and base:
+            ratio = best / base
+            note = f"{ratio:5.2f}× baseline"
+            if ratio > args.threshold:
+                note += "  REGRESSION"
+                regressions.append(name)
+        print(f"{name:<28} {_fmt(best)}  {note}")
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"baseline saved to {os.path.relpath(BASELINE_PATH, ROOT)}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold}×: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# SMART Insulin Worksheet — admin latency page
+# Per-stage rerun timings (p50/p95/p99) for this server process.
+# Admin-only: requires SMART_INSULIN_ADMIN_TOKEN to be set on the server and entered here.
+
+import hmac
+import os
+
+import streamlit as st
+
+from smart_insulin import timing
+
+st.set_page_config(page_title="Latency (admin)", page_icon="⏱️", layout="wide")
+st.title("Rerun latency by stage")
+
+admin_token = os.environ.get("SMART_INSULIN_ADMIN_TOKEN", "")
+if not admin_token:
+    st.info("Admin page disabled. Set SMART_INSULIN_ADMIN_TOKEN on the server to enable it.")
+    st.stop()
+
+token = st.text_input("Admin token", type="password")
+if not hmac.compare_digest(token.encode(), admin_token.encode()):
+    st.stop()
+
+if not timing.ENABLED:
+    st.warning("Timing is off. Start the server with SMART_INSULIN_TIMING=1 to collect stage timings.")
+
+stages = timing.snapshot()
+if stages:
+    st.dataframe(
+        [
+            {
+                "Stage": name,
+                "Count": s["count"],
+                "Mean (ms)": round(s["mean_ms"], 2),
+                "p50 (ms)": round(s["p50_ms"], 2),
+                "p95 (ms)": round(s["p95_ms"], 2),
+                "p99 (ms)": round(s["p99_ms"], 2),
+            }
+            for name, s in stages.items()
+        ],
+        use_container_width=True,
+    )
+else:
+    st.caption("No samples yet.")
+
+col1, col2 = st.columns(2)
+with col1:
+    st.download_button("Download JSON", data=timing.dump_json(), file_name="stage_timings.json", mime="application/json")
+with col2:
+    if st.button("Reset timings"):
+        timing.reset()
+        st.rerun()
@@ -0,0 +1,32 @@
+# SMART Insulin Worksheet — importable dosing engine (no Streamlit side effects)
+
+from .dosing import (
+    BINS_40,
+    BOLUS_TYPES,
+    CATEGORIES,
+    CORRECTION_TYPES,
+    FACTORS,
+    PROTOCOL_VERSION,
+    REGIMENS,
+    STEPS,
+    VISIT_TYPES,
+    bolus_correction,
+    bolus_isf,
+    bolus_reference_rows,
+    compute_tdd,
+    compute_tdd_half,
+    correction_factor,
+    correction_rows,
+    correction_table,
+    correction_units,
+    from_half_units,
+    regimen_doses,
+    regimen_doses_half,
+    round_unit,
+    target_for,
+    to_half_units,
+)
+from .cache import TTLCache
+from .regimens import DOSE_NAMES, REGIMEN_BY_NAME, REGIMEN_TABLE
+from .tables import lookup_correction_table, lookup_correction_table_half, warm_correction_tables
+from .prescription import Prescription, build_prescription
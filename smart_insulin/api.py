@@ -0,0 +1,270 @@
+# SMART Insulin Worksheet — HTTP JSON API
+# Async (aiohttp) endpoints for the worksheet math, mirroring the entry form and the
+# bolus calculator. The math is microseconds per call, so handlers compute inline.
+#
+#   python -m smart_insulin.api --port 8600
+#
+#   POST /tdd               {weight, factor, visit, prev_tdd?, step?}
+#   POST /regimen           {regimen, weight, tdd}
+#   POST /correction-table  {tdd, category, correction_type?}
+#   POST /bolus             {tdd, bolus_type, premeal_bs}
+#   POST /prescription      {name?, weight, category, factor, visit, prev_tdd?, regimen, step?, correction_type?}
+#   POST /prescriptions/stream   NDJSON in (one /prescription body per line) → NDJSON out
+#   GET  /health
+
+import argparse
+import json
+
+from aiohttp import web
+
+from .dosing import (
+    BOLUS_TYPES,
+    CATEGORIES,
+    CORRECTION_TYPES,
+    STEPS,
+    VISIT_TYPES,
+    bolus_correction,
+    bolus_reference_rows,
+    compute_tdd,
+    compute_tdd_half,
+    regimen_doses,
+    target_for,
+)
+from .prescription import build_prescription
+from .regimens import REGIMENS
+from .tables import lookup_correction_table, warm_correction_tables
+from .validation import FACTOR_RANGE, PREV_TDD_RANGE, WEIGHT_RANGE, check_choice, check_number
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# --------------------------- Validation (entry form limits) ---------------------------
+def _number(body, key, lo, hi):
+    value = body.get(key)
+    if value is None:
+        raise BadRequest(f"missing field: {key}")
+    try:
+        return check_number(value, key, lo, hi)
+    except ValueError as exc:
+        raise BadRequest(str(exc)) from None
+
+
+def _choice(body, key, choices, default=None):
+    value = body.get(key, default)
+    if value is None:
+        raise BadRequest(f"missing field: {key}")
+    try:
+        return check_choice(value, key, choices)
+    except ValueError as exc:
+        raise BadRequest(str(exc)) from None
+
+
+def _entry(body):
+    """Validated entry-form fields from a request body."""
+    visit = _choice(body, "visit", VISIT_TYPES)
+    prev_tdd = None
+    if visit != "Initial prescription" and body.get("prev_tdd") is not None:
+        prev_tdd = _number(body, "prev_tdd", *PREV_TDD_RANGE)
+    entry = {
+        "wt": _number(body, "weight", *WEIGHT_RANGE),
+        "factor": _number(body, "factor", *FACTOR_RANGE),
+        "visit": visit,
+        "prev_tdd": prev_tdd,
+        "step": int(_choice(body, "step", STEPS, default=15)),
+    }
+    if compute_tdd_half(entry["wt"], entry["factor"], visit, prev_tdd, entry["step"])[0] < 1:
+        raise BadRequest("prev_tdd too small: TDD rounds to 0 U")
+    return entry
+
+
+# --------------------------- Handlers ---------------------------
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("body must be a JSON object")
+    return body
+
+
+async def tdd_handler(request):
+    e = _entry(await _json_body(request))
+    tdd, adj_note = compute_tdd(e["wt"], e["factor"], e["visit"], e["prev_tdd"], e["step"])
+    return web.json_response({"tdd": tdd, "adj_note": adj_note})
+
+
+async def regimen_handler(request):
+    body = await _json_body(request)
+    regimen = _choice(body, "regimen", REGIMENS)
+    wt = _number(body, "weight", *WEIGHT_RANGE)
+    tdd = _number(body, "tdd", 0.5, 400.0)
+    return web.json_response({"regimen": regimen, "doses": regimen_doses(regimen, wt, tdd)})
+
+
+async def correction_handler(request):
+    body = await _json_body(request)
+    tdd = _number(body, "tdd", 0.5, 400.0)
+    target = target_for(_choice(body, "category", CATEGORIES))
+    corr_type = _choice(body, "correction_type", CORRECTION_TYPES, default=CORRECTION_TYPES[0])
+    cf, rows = lookup_correction_table(tdd, corr_type, target)
+    return web.json_response({"cf": cf, "target": target, "rows": rows})
+
+
+async def bolus_handler(request):
+    body = await _json_body(request)
+    tdd = _number(body, "tdd", 5.0, 300.0)
+    bol_type = _choice(body, "bolus_type", BOLUS_TYPES)
+    premeal_bs = _number(body, "premeal_bs", 60, 600)
+    isf, units_usual, units_hypo = bolus_correction(tdd, bol_type, premeal_bs)
+    return web.json_response(
+        {"isf": isf, "units_usual": units_usual, "units_hypo": units_hypo, "reference_rows": bolus_reference_rows(isf)}
+    )
+
+
+def prescription_json(body):
+    """Validate one patient record and return the full prescription as a JSON-ready dict."""
+    e = _entry(body)
+    rx = build_prescription(
+        str(body.get("name") or ""),
+        e["wt"],
+        _choice(body, "category", CATEGORIES),
+        e["factor"],
+        e["visit"],
+        e["prev_tdd"],
+        _choice(body, "regimen", REGIMENS),
+        e["step"],
+        _choice(body, "correction_type", CORRECTION_TYPES, default=CORRECTION_TYPES[0]),
+    )
+    return {
+        "name": rx.pname,
+        "tdd": rx.tdd,
+        "adj_note": rx.adj_note,
+        "target": rx.target,
+        "regimen": rx.regimen,
+        "doses": rx.dose_map,
+        "correction_type": rx.corr_type,
+        "cf": rx.cf,
+        "correction_rows": rx.correction_records(),
+    }
+
+
+async def prescription_handler(request):
+    return web.json_response(prescription_json(await _json_body(request)))
+
+
+# Output is flushed to the client once this many bytes are buffered; each flush awaits
+# the socket drain, so a slow reader pauses us (and aiohttp stops reading the body).
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+# An input line longer than this is answered with an error row and skipped.
+STREAM_MAX_LINE_BYTES = 64 * 1024
+
+
+async def _iter_lines(content, limit=STREAM_MAX_LINE_BYTES):
+    """Yield each NDJSON input line, or None for a line over limit (skipped through its newline).
+
+    Split here from readany() chunks rather than with readline(), whose over-limit error
+    differs across aiohttp versions and leaves the rest of the line in the stream.
+    """
+    pending = bytearray()
+    skipping = False
+    while True:
+        chunk = await content.readany()
+        if not chunk:
+            break
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl == -1:
+                if not skipping:
+                    pending += chunk[start:]
+                    if len(pending) > limit:
+                        pending.clear()
+                        skipping = True
+                break
+            if skipping:
+                skipping = False
+                yield None
+            else:
+                pending += chunk[start : nl + 1]
+                yield bytes(pending) if len(pending) <= limit else None
+                pending.clear()
+            start = nl + 1
+    if skipping:
+        yield None
+    elif pending:
+        yield bytes(pending)
+
+
+async def stream_handler(request):
+    """Bulk NDJSON: one patient per input line, one result (or error) per output line, in order."""
+    resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await resp.prepare(request)
+    buf = bytearray()
+    lineno = 0
+    async for raw in _iter_lines(request.content):
+        lineno += 1
+        if raw is not None and not raw.strip():
+            continue
+        try:
+            if raw is None:
+                raise BadRequest("line too long")
+            body = json.loads(raw)
+            if not isinstance(body, dict):
+                raise BadRequest("line must be a JSON object")
+            out = prescription_json(body)
+        except (BadRequest, ValueError) as exc:
+            out = {"line": lineno, "error": str(exc)}
+        buf += json.dumps(out).encode("utf-8") + b"\n"
+        if len(buf) >= STREAM_FLUSH_BYTES:
+            await resp.write(bytes(buf))
+            buf.clear()
+    if buf:
+        await resp.write(bytes(buf))
+    await resp.write_eof()
+    return resp
+
+
+async def health_handler(request):
+    return web.json_response({"status": "ok"})
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    try:
+        return await handler(request)
+    except BadRequest as exc:
+        return web.json_response({"error": str(exc)}, status=400)
+
+
+def create_app():
+    warm_correction_tables()
+    app = web.Application(middlewares=[error_middleware])
+    app.add_routes(
+        [
+            web.post("/tdd", tdd_handler),
+            web.post("/regimen", regimen_handler),
+            web.post("/correction-table", correction_handler),
+            web.post("/bolus", bolus_handler),
+            web.post("/prescription", prescription_handler),
+            web.post("/prescriptions/stream", stream_handler),
+            web.get("/health", health_handler),
+        ]
+    )
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SMART Insulin Worksheet JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args(argv)
+    web.run_app(create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# SMART Insulin Worksheet — vectorized batch dosing (NumPy)
+# Same visit logic as dosing.compute_tdd, applied to whole cohorts in one pass.
+# Kept out of the package __init__ so the scalar engine stays NumPy-free.
+
+import numpy as np
+
+from .dosing import VISIT_TYPES
+from .regimens import DOSE_NAMES, REGIMEN_TABLE, REGIMENS
+
+# Visit-type codes (index into VISIT_TYPES)
+INITIAL, REPEAT, INADEQUATE, HYPO = range(len(VISIT_TYPES))
+
+
+def round_unit_array(x, step=0.5):
+    """Vectorized round_unit (round-half-even, same as Python's round)."""
+    return step * np.round(np.asarray(x, dtype=np.float64) / step)
+
+
+def _codes(values, labels, what):
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        if ((arr < 0) | (arr >= len(labels))).any():
+            raise ValueError(f"{what} code out of range")
+        return arr.astype(np.int8)
+    codes = np.full(arr.shape, -1, dtype=np.int8)
+    for i, name in enumerate(labels):
+        codes[arr == name] = i
+    if (codes < 0).any():
+        bad = arr[codes < 0][0]
+        raise ValueError(f"unknown {what}: {bad!r}")
+    return codes
+
+
+def visit_codes(visits):
+    """Map visit labels (or already-integer codes) to int8 codes."""
+    return _codes(visits, VISIT_TYPES, "visit type")
+
+
+def regimen_codes(regimens):
+    """Map regimen labels (or already-integer codes) to int8 codes."""
+    return _codes(regimens, REGIMENS, "regimen")
+
+
+# --------------------------- Half-unit arithmetic ---------------------------
+# Same scheme as dosing: inputs as fixed-point hundredths, one round-half-even division,
+# results as int16 half-units (1 = 0.5 U). Intermediates are whole numbers held in float64,
+# which is exact below 2**53 and avoids slow int64 division.
+HALF_UNIT_DTYPE = np.int16
+NOT_APPLICABLE = -1  # half-unit value for a dose the patient's regimen does not have
+
+
+def _centi(x):
+    """Fixed-point hundredths as whole-number float64 (e.g. 70.3 kg → 7030.0)."""
+    return np.rint(np.asarray(x, dtype=np.float64) * 100)
+
+
+def _round_div(n, d):
+    """Elementwise n / d rounded to the nearest integer, ties to even (whole numbers, d > 0).
+
+    For |n| < 2**51 the float quotient is within |n / d| × 2**-53 of the true value,
+    while a non-tie is at least 1 / (2d) from x.5, so np.rint gives the exact result.
+    """
+    return np.rint(n / d)
+
+
+def _as_half_units(half):
+    if half.size and half.max() > np.iinfo(HALF_UNIT_DTYPE).max:
+        raise ValueError("dose out of int16 half-unit range")
+    return half.astype(HALF_UNIT_DTYPE)
+
+
+def to_half_units_array(x):
+    """Vectorized dosing.to_half_units (int64)."""
+    return np.rint(np.asarray(x, dtype=np.float64) * 2).astype(np.int64)
+
+
+def from_half_units_array(half):
+    """Half-units → float units; NOT_APPLICABLE becomes NaN."""
+    half = np.asarray(half)
+    return np.where(half == NOT_APPLICABLE, np.nan, half / 2)
+
+
+def compute_tdd_batch_half(wt, factor, visit, prev_tdd=None, step=15):
+    """TDD in int16 half-units for every patient.
+
+    wt, factor, visit, prev_tdd and step are arrays (or scalars) broadcast together.
+    visit holds VISIT_TYPES labels or their integer codes; a missing (None/NaN) or
+    zero previous TDD falls back to weight × factor, as in the single-patient form.
+    Values match dosing.compute_tdd_half exactly.
+    """
+    codes = visit_codes(visit)
+    step = np.asarray(step, dtype=np.float64)
+    num = _centi(wt) * _centi(factor)  # weight × factor, in 1/10000 U
+    use_base = codes == INITIAL
+    if prev_tdd is not None:
+        prev = np.asarray(prev_tdd, dtype=np.float64)
+        use_base = use_base | np.isnan(prev) | (prev == 0)
+        num = np.where(use_base, num, _centi(prev) * 100)
+    multiplier = 100 + step * (codes == INADEQUATE) - step * (codes == HYPO)
+    return _as_half_units(_round_div(num * multiplier, 500_000))  # 1/1000000 U → half-units
+
+
+def compute_tdd_batch(wt, factor, visit, prev_tdd=None, step=15):
+    """Rounded TDD (0.5 U) for every patient, as floats (see compute_tdd_batch_half)."""
+    return from_half_units_array(compute_tdd_batch_half(wt, factor, visit, prev_tdd, step))
+
+
+# --------------------------- Regimen splits ---------------------------
+def regimen_doses_batch_half(regimen, wt, tdd_half):
+    """Regimen doses in int16 half-units for every patient in one vectorized pass.
+
+    Returns {dose name: int16 array} over DOSE_NAMES; NOT_APPLICABLE where the patient's
+    regimen has no such dose. Values match dosing.regimen_doses_half exactly.
+    """
+    codes = regimen_codes(regimen)
+    codes, wt, tdd_half = np.broadcast_arrays(codes, _centi(wt), np.asarray(tdd_half, dtype=np.float64))
+    shape = codes.shape
+    codes, wt, tdd_half = codes.ravel(), wt.ravel(), tdd_half.ravel()
+    values = np.full((codes.size, len(DOSE_NAMES)), NOT_APPLICABLE, dtype=np.float64)
+    # One group per regimen, so each patient only computes the doses of their own regimen
+    for i, reg in enumerate(REGIMEN_TABLE):
+        rows = np.flatnonzero(codes == i)
+        if not rows.size:
+            continue
+        tdd_i, wt_i = tdd_half[rows], wt[rows]
+        for dose in reg.doses:
+            if dose.basis == "tdd":
+                half = _round_div(tdd_i * dose.num, dose.div)
+            else:  # weight in 1/100 kg, × 2 for half-units
+                half = _round_div(wt_i * (2 * dose.num), 100 * dose.div)
+            values[rows, DOSE_NAMES.index(dose.name)] = half
+    values = _as_half_units(values).reshape(shape + (len(DOSE_NAMES),))
+    return {name: values[..., j] for j, name in enumerate(DOSE_NAMES)}
+
+
+def regimen_doses_batch(regimen, wt, tdd):
+    """Regimen doses for every patient in one vectorized step.
+
+    Returns {dose name: float array} over DOSE_NAMES; NaN where the patient's regimen
+    has no such dose. Values match dosing.regimen_doses exactly.
+    """
+    halves = regimen_doses_batch_half(regimen, wt, to_half_units_array(tdd))
+    return {name: from_half_units_array(h) for name, h in halves.items()}
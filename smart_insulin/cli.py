@@ -0,0 +1,149 @@
+# SMART Insulin Worksheet — headless CSV batch mode
+# Streams a clinic roster through TDD → regimen split → correction table in fixed-size
+# chunks, writing each chunk out before reading the next (bounded memory).
+#
+#   python -m smart_insulin.cli roster.csv results.csv --chunk-size 10000
+#
+# Roster columns (same fields as the entry form):
+#   name, weight, category, factor, visit, prev_tdd, regimen
+# Optional: step (escalation/de-escalation %, default 15),
+#           correction_type (default "Rapid analogue (1800/TDD)")
+
+import argparse
+import csv
+import sys
+from itertools import islice
+
+import numpy as np
+
+from .batch import NOT_APPLICABLE, compute_tdd_batch_half, regimen_doses_batch_half
+from .dosing import BINS_40, CATEGORIES, CORRECTION_TYPES, STEPS, VISIT_TYPES, from_half_units, target_for
+from .regimens import DOSE_NAMES
+from .tables import lookup_correction_table_half
+from .validation import FACTOR_RANGE, PREV_TDD_RANGE, WEIGHT_RANGE
+
+ROSTER_FIELDS = ("name", "weight", "category", "factor", "visit", "prev_tdd", "regimen")
+
+DOSE_FIELDS = DOSE_NAMES
+
+CORR_LABELS = tuple(f"{lo}-{hi}" for lo, hi in BINS_40) + (f">{BINS_40[-1][1]}",)
+CORR_FIELDS = tuple(f"corr_{label}_{kind}" for label in CORR_LABELS for kind in ("usual", "hypo"))
+
+OUTPUT_FIELDS = ROSTER_FIELDS + ("step", "correction_type", "tdd", "target", "cf") + DOSE_FIELDS + CORR_FIELDS
+
+
+def _float_or_nan(value):
+    value = (value or "").strip()
+    return float(value) if value else float("nan")
+
+
+def iter_chunks(reader, chunk_size):
+    """Yield lists of at most chunk_size rows from a csv.DictReader."""
+    while True:
+        chunk = list(islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _patient(r):
+    return r.get("name") or "patient"
+
+
+def _check_choices(rows, values, key, choices):
+    """values (one per row) if all are in choices, like the entry form's select boxes."""
+    for r, value in zip(rows, values):
+        if value not in choices:
+            raise ValueError(f"{_patient(r)}: {key} must be one of: {', '.join(map(str, choices))}")
+    return values
+
+
+def _check_range(rows, values, key, lo, hi, skip=None):
+    """values as float64, all within [lo, hi] (NaN and ±inf rejected) except where skip is set."""
+    arr = np.asarray(values, dtype=np.float64)
+    ok = (arr >= lo) & (arr <= hi)
+    if skip is not None:
+        ok |= skip
+    if not ok.all():
+        raise ValueError(f"{_patient(rows[int(np.argmin(ok))])}: {key} must be between {lo} and {hi}")
+    return arr
+
+
+def process_chunk(rows):
+    """Compute output rows for one chunk of roster rows (ValueError names the first bad row)."""
+    visits = [r["visit"] for r in rows]
+    initial = np.array([v == VISIT_TYPES[0] for v in visits])
+    # A missing previous TDD (NaN) falls back to weight × factor, as in the form
+    no_prev = initial | np.array([not (r.get("prev_tdd") or "").strip() for r in rows])
+    weights = _check_range(rows, [float(r["weight"]) for r in rows], "weight", *WEIGHT_RANGE)
+    factors = _check_range(rows, [float(r["factor"]) for r in rows], "factor", *FACTOR_RANGE)
+    prev = _check_range(rows, [_float_or_nan(r.get("prev_tdd")) for r in rows], "prev_tdd", *PREV_TDD_RANGE, no_prev)
+    steps = _check_choices(rows, [float(r.get("step") or 15) for r in rows], "step", STEPS)
+    steps = [int(step) for step in steps]
+    categories = _check_choices(rows, [r["category"] for r in rows], "category", CATEGORIES)
+    corr_types = _check_choices(
+        rows, [r.get("correction_type") or CORRECTION_TYPES[0] for r in rows], "correction_type", CORRECTION_TYPES
+    )
+    tdds = compute_tdd_batch_half(weights, factors, visits, np.where(no_prev, np.nan, prev), steps)
+    doses = regimen_doses_batch_half([r["regimen"] for r in rows], weights, tdds)
+    dose_cols = [(name, values.tolist()) for name, values in doses.items()]
+    out = []
+    per_row = zip(rows, steps, categories, corr_types, tdds.tolist())
+    for i, (r, step, category, corr_type, tdd_half) in enumerate(per_row):
+        if tdd_half < 1:
+            raise ValueError(f"{_patient(r)}: TDD rounds to 0 U; check the weight and previous TDD")
+        target = target_for(category)
+        cf, corr_rows = lookup_correction_table_half(tdd_half, corr_type, target)
+        rec = {k: r.get(k, "") for k in ROSTER_FIELDS}
+        rec.update(step=step, correction_type=corr_type, tdd=from_half_units(tdd_half), target=target, cf=round(cf, 1))
+        for name, values in dose_cols:
+            if values[i] != NOT_APPLICABLE:
+                rec[name] = from_half_units(values[i])
+        for label, row in zip(CORR_LABELS, corr_rows):
+            rec[f"corr_{label}_usual"] = row["Usual (≤130) U"]
+            rec[f"corr_{label}_hypo"] = row["Hypo-concern (≤140) U"]
+        out.append(rec)
+    return out
+
+
+def run(src, dst, chunk_size=10_000, progress=None):
+    """Stream src (roster CSV) to dst (results CSV). Returns the number of patients written."""
+    reader = csv.DictReader(src)
+    missing = [f for f in ROSTER_FIELDS if f not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"roster is missing columns: {', '.join(missing)}")
+    writer = csv.DictWriter(dst, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    total = 0
+    for chunk in iter_chunks(reader, chunk_size):
+        writer.writerows(process_chunk(chunk))
+        dst.flush()
+        total += len(chunk)
+        if progress:
+            progress(total)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SMART Insulin Worksheet — batch roster processing")
+    parser.add_argument("roster", help="input roster CSV ('-' for stdin)")
+    parser.add_argument("output", help="output CSV ('-' for stdout)")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="rows per chunk (default 10000)")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.roster == "-" else open(args.roster, newline="", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        total = run(src, dst, args.chunk_size, progress=lambda n: print(f"{n} patients", file=sys.stderr))
+    except (KeyError, ValueError) as exc:
+        parser.exit(1, f"error: {exc}\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    print(f"done: {total} patients", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# SMART Insulin Worksheet — dosing engine
+# Pure-Python versions of the worksheet math: TDD by visit type, regimen splits,
+# 40 mg/dL correction tables and the bolus correction calculator.
+# No Streamlit / pandas / reportlab imports here so it stays cheap to import.
+
+import math
+
+from .regimens import REGIMEN_BY_NAME, REGIMENS
+
+# Bump when the dosing protocol or worksheet layout changes (invalidates cached PDFs)
+PROTOCOL_VERSION = 2
+
+# --------------------------- Choices (match the entry form labels) ---------------------------
+CATEGORIES = ("Usual", "Hypoglycemia concern")
+
+FACTORS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6)
+
+VISIT_TYPES = (
+    "Initial prescription",
+    "Repeat prescription (with previous TDD)",
+    "Inadequate control (with previous TDD)",
+    "Hypoglycemia (with previous TDD)",
+)
+
+STEPS = (10, 15, 20)
+
+CORRECTION_TYPES = ("Rapid analogue (1800/TDD)", "Regular (1500/TDD)")
+
+BOLUS_TYPES = ("Regular (1500/TDD)", "Rapid Acting (1800/TDD)")
+
+# Fixed 40 mg/dL bins
+BINS_40 = ((131, 170), (171, 210), (211, 250), (251, 290), (291, 330))
+
+
+def round_unit(x, step=0.5):
+    return step * round(float(x) / step)
+
+
+# --------------------------- Half-unit arithmetic ---------------------------
+# Doses are carried as integer half-units (1 = 0.5 U) from TDD through the splits and
+# correction tables; inputs (kg, U/kg, U) are read as fixed-point hundredths. Each value is
+# an integer ratio n / d rounded once, half-to-even, as round(n / d): n and d are small
+# integers, so the float quotient is within n/d × 2**-53 of the true value and lands on x.5
+# only for a true tie. Results are exact and trivially hashable / int16-storable.
+
+
+def to_half_units(x):
+    """Units → nearest integer half-units (round-half-even, as round_unit)."""
+    return round(float(x) * 2)
+
+
+def from_half_units(half):
+    """Integer half-units → units (exact float, e.g. 43 → 21.5)."""
+    return half / 2
+
+
+def target_for(category):
+    """Pre-meal goal (mg/dL) for the risk category."""
+    return 130 if category == "Usual" else 140
+
+
+# --------------------------- TDD ---------------------------
+def compute_tdd(wt, factor, visit, prev_tdd=None, step=15):
+    """Return (tdd, adj_note) for one patient; tdd is rounded to 0.5 U.
+
+    Computed in integer half-units (weight × factor or previous TDD in 1/10000 U, then one
+    rounding); the final / 2 is exact.
+    """
+    if visit == "Initial prescription":
+        return round(round(wt * 100) * round(factor * 100) / 5000) / 2, "Initial: TDD = weight × factor"
+    if prev_tdd:
+        num = round(prev_tdd * 100) * 100
+    else:
+        num = round(wt * 100) * round(factor * 100)
+    if visit == "Repeat prescription (with previous TDD)":
+        return round(num / 5000) / 2, "Repeat: using previous TDD"
+    if visit == "Inadequate control (with previous TDD)":
+        return round(num * (100 + step) / 500000) / 2, f"Escalation: +{step}% applied to previous TDD"
+    if visit == "Hypoglycemia (with previous TDD)":
+        return round(num * (100 - step) / 500000) / 2, f"De-escalation: -{step}% applied to previous TDD"
+    raise ValueError(f"unknown visit type: {visit!r}")
+
+
+def compute_tdd_half(wt, factor, visit, prev_tdd=None, step=15):
+    """Return (tdd in half-units, adj_note) for one patient."""
+    tdd, adj_note = compute_tdd(wt, factor, visit, prev_tdd, step)
+    return round(tdd * 2), adj_note
+
+
+# --------------------------- Regimen splits ---------------------------
+# Each Dose row as (name, on TDD?, num, den): TDD is taken in half-units and weight in
+# 1/100 kg × 2, so every dose is round(basis × num / den) in half-units — exact
+# round-half-even, since n and d are small integers (see above).
+_SPLITS = {
+    name: tuple((d.name, d.basis == "tdd", d.num, d.div if d.basis == "tdd" else 100 * d.div) for d in r.doses)
+    for name, r in REGIMEN_BY_NAME.items()
+}
+
+
+def regimen_doses_half(regimen, wt, tdd_half):
+    """Named doses in half-units for the chosen regimen, from the regimen table."""
+    w = 2 * round(float(wt) * 100)
+    return {name: round((tdd_half if on_tdd else w) * num / den) for name, on_tdd, num, den in _SPLITS[regimen]}
+
+
+def regimen_doses(regimen, wt, tdd):
+    """Named doses (U, rounded to 0.5) for the chosen regimen, from the regimen table."""
+    t = round(float(tdd) * 2)
+    w = 2 * round(float(wt) * 100)
+    return {name: round((t if on_tdd else w) * num / den) / 2 for name, on_tdd, num, den in _SPLITS[regimen]}
+
+
+# --------------------------- Correction table ---------------------------
+def _correction_rule(corr_type):
+    return 1800 if "Rapid" in corr_type else 1500
+
+
+def correction_factor(tdd, corr_type):
+    """mg/dL lowered by 1 U: 1800/TDD for rapid analogue, 1500/TDD for regular."""
+    return _correction_rule(corr_type) / float(tdd)
+
+
+def correction_units(tdd_half, corr_type, target, bins=BINS_40):
+    """Usual-target correction units per row (one per bin plus the >330 row), in whole units.
+
+    ceil(delta / cf) with cf = rule / tdd is ceil(delta × tdd_half / (2 × rule)): exact in integers.
+    """
+    den = 2 * _correction_rule(corr_type)
+    top = bins[-1][1] + 1
+    units = [max(1, -(-max(0, lo - target) * tdd_half // den)) for lo, _ in bins]
+    units.append(max(1, -(-max(0, top - target) * tdd_half // den)) + 5)  # >330 safety bump
+    return units
+
+
+_ROW_LABELS = {}  # bins -> row labels ("131-170", ..., ">330")
+
+
+def correction_rows(tdd_half, corr_type, target, bins=BINS_40):
+    """Correction rows for the worksheet (one per bin plus the >330 row)."""
+    labels = _ROW_LABELS.get(bins)
+    if labels is None:
+        labels = _ROW_LABELS[bins] = tuple(f"{lo}-{hi}" for lo, hi in bins) + (f">{bins[-1][1]}",)
+    return [
+        {"Pre-meal (mg/dL)": label, "Usual (≤130) U": usual, "Hypo-concern (≤140) U": max(0, usual - 1)}
+        for label, usual in zip(labels, correction_units(tdd_half, corr_type, target, bins))
+    ]
+
+
+def correction_table(tdd, corr_type, target, bins=BINS_40):
+    """Return (cf, rows) for the worksheet correction table (tdd is taken on the 0.5 U grid)."""
+    half = round(tdd * 2)
+    return _correction_rule(corr_type) * 2 / half, correction_rows(half, corr_type, target, bins)
+
+
+# --------------------------- Bolus correction calculator ---------------------------
+def bolus_isf(bol_tdd, bol_type):
+    """Insulin sensitivity factor: 1500/TDD for regular, 1800/TDD for rapid acting."""
+    return 1500 / bol_tdd if "Regular" in bol_type else 1800 / bol_tdd
+
+
+def bolus_correction(bol_tdd, bol_type, premeal_bs):
+    """Return (isf, units_usual, units_hypo) for one pre-meal glucose value."""
+    isf = bolus_isf(bol_tdd, bol_type)
+    units_usual = 0 if premeal_bs <= 130 else math.ceil((premeal_bs - 130) / isf)
+    units_hypo = 0 if premeal_bs <= 140 else math.ceil((premeal_bs - 140) / isf)
+    return isf, units_usual, units_hypo
+
+
+def bolus_reference_rows(isf, bins=BINS_40):
+    """Reference correction table for the bolus calculator (usual ≤130, hypo-prone ≤140)."""
+    rows_ref = []
+    for lo, hi in bins:
+        delta_usual = max(0, lo - 130)
+        delta_hypo = max(0, lo - 140)
+        u_usual = max(1, int(math.ceil(delta_usual / isf)))
+        u_hypo = max(0, int(math.ceil(delta_hypo / isf)))
+        rows_ref.append({"Pre-meal (mg/dL)": f"{lo}-{hi}", "Usual (≤130) U": u_usual, "Hypo-prone (≤140) U": u_hypo})
+    top = bins[-1][1] + 1
+    delta_usual = max(0, top - 130)
+    delta_hypo = max(0, top - 140)
+    rows_ref.append(
+        {
+            "Pre-meal (mg/dL)": f">{top - 1}",
+            "Usual (≤130) U": max(1, int(math.ceil(delta_usual / isf))) + 5,
+            "Hypo-prone (≤140) U": max(0, int(math.ceil(delta_hypo / isf))) + 4,
+        }
+    )
+    return rows_ref
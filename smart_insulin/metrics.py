@@ -0,0 +1,205 @@
+# SMART Insulin Worksheet — Prometheus metrics
+# Counters and histograms rendered in the Prometheus text exposition format and served
+# from a small local HTTP endpoint next to the Streamlit server.
+#
+#   SMART_INSULIN_METRICS_PORT=9464 streamlit run app.py
+#   python -m smart_insulin.metrics http://127.0.0.1:9464/metrics   # stand-in scraper
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import timing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INF = float("inf")
+
+
+def _fmt(value):
+    if value == _INF:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) + ((_INF,) if buckets[-1] != _INF else ())
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # labels -> [bucket counts, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            slot = self._values.get(key)
+            if slot is None:
+                slot = self._values[key] = [[0] * len(self.buckets), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    slot[0][i] += 1
+                    break
+            slot[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for key, (counts, total) in items:
+            yield from _histogram_lines(self.name, self.labelnames, key, self.buckets, counts, total)
+
+
+def _histogram_lines(name, labelnames, key, buckets, counts, total):
+    cumulative = 0
+    for bound, n in zip(buckets, counts):
+        cumulative += n
+        yield f"{name}_bucket{_labels(labelnames, key, [('le', _fmt(bound))])} {cumulative}"
+    yield f"{name}_sum{_labels(labelnames, key)} {_fmt(total)}"
+    yield f"{name}_count{_labels(labelnames, key)} {cumulative}"
+
+
+# --------------------------- Worksheet metrics ---------------------------
+RERUNS = Counter("smart_insulin_reruns_total", "Script reruns per page section.", ["section"])
+REGIMENS = Counter("smart_insulin_regimen_total", "Submitted entries per regimen.", ["regimen"])
+PDF_RENDERS = Counter("smart_insulin_pdf_renders_total", "PDF summaries rendered.")
+PDF_BYTES = Histogram(
+    "smart_insulin_pdf_bytes", "Size of rendered PDF summaries (bytes).", [2_000, 4_000, 8_000, 16_000, 32_000, 64_000]
+)
+
+_METRICS = [RERUNS, REGIMENS, PDF_RENDERS, PDF_BYTES]
+_caches = {}  # name -> TTLCache
+_lock = threading.Lock()
+
+
+def register_cache(name, cache):
+    """Export hit/miss/eviction counters and size of a TTLCache under cache=name."""
+    with _lock:
+        _caches[name] = cache
+
+
+def _cache_lines():
+    with _lock:
+        caches = sorted(_caches.items())
+    stats = [(name, cache.stats()) for name, cache in caches]
+    for metric, key, kind, help in (
+        ("smart_insulin_cache_hits_total", "hits", "counter", "Cache hits."),
+        ("smart_insulin_cache_misses_total", "misses", "counter", "Cache misses."),
+        ("smart_insulin_cache_evictions_total", "evictions", "counter", "Cache evictions."),
+        ("smart_insulin_cache_entries", "entries", "gauge", "Entries currently cached."),
+    ):
+        yield f"# HELP {metric} {help}"
+        yield f"# TYPE {metric} {kind}"
+        for name, s in stats:
+            yield f'{metric}{{cache="{_escape(name)}"}} {_fmt(s[key])}'
+
+
+def _stage_lines():
+    # Compute latency per stage, taken from the timing histograms (ms → seconds)
+    name = "smart_insulin_stage_duration_seconds"
+    yield f"# HELP {name} Rerun stage latency (needs SMART_INSULIN_TIMING=1)."
+    yield f"# TYPE {name} histogram"
+    buckets = tuple(b / 1000 for b in timing.BUCKETS_MS)
+    for stage, counts, total_ms in timing.histograms():
+        yield from _histogram_lines(name, ("stage",), (stage,), buckets, counts, total_ms / 1000)
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    lines.extend(_cache_lines())
+    lines.extend(_stage_lines())
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------- HTTP endpoint ---------------------------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # keep scrapes out of the Streamlit log
+        pass
+
+
+_server = None
+
+
+def start_server(port, addr="127.0.0.1"):
+    """Serve /metrics on addr:port from a daemon thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((addr, port), _Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+
+def parse(text):
+    """Parse exposition text into {sample name with labels: value} (enough for a local scraper)."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        samples[name] = float(value)
+    return samples
+
+
+def scrape(url, timeout=5):
+    """Fetch and parse one scrape of url — a stand-in for the Prometheus server."""
+    from urllib.request import urlopen
+
+    with urlopen(url, timeout=timeout) as resp:
+        return parse(resp.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    for sample, value in scrape(sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:9464/metrics").items():
+        print(f"{sample} {value:g}")
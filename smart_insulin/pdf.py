@@ -0,0 +1,157 @@
+# SMART Insulin Worksheet — PDF summary export
+# Renders the one-page worksheet summary with reportlab. Nothing here runs at import
+# time; callers build the PDF only when it is actually requested.
+
+from importlib.util import find_spec
+from io import BytesIO
+
+from .regimens import REGIMEN_BY_NAME
+
+# reportlab (installed via requirements.txt) is only imported when a PDF is built;
+# here we just check that it is available.
+REPORTLAB_OK = find_spec("reportlab") is not None
+
+
+# Static parts of every worksheet (title, section title, disclaimer, signature line) are
+# drawn once per document as form XObjects and stamped onto each patient's pages; this
+# pays off in multi-patient documents only.
+HEADER_FORM = "worksheet_header"
+FOOTER_FORM = "worksheet_footer"
+
+
+def _draw_header(c):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+
+    w, h = A4
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(2 * cm, h - 2 * cm, "SMART Insulin Worksheet — Developed by Dr Parimal Swamy")
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(2 * cm, h - 4 * cm, "Regimen-specific Doses")
+
+
+def _draw_footer(c):
+    from reportlab.lib.units import cm
+
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawString(
+        2 * cm,
+        1.9 * cm,
+        "Add correction dose to scheduled pre-meal bolus. Adjust for renal/hepatic status; "
+        "check ketones if >330 mg/dL or symptomatic.",
+    )
+    c.drawString(2 * cm, 1.4 * cm, "Signature: _______________________    Date: __/__/____")
+
+
+def _define_layers(c):
+    """Define the header/footer forms once per document (must run on a blank page)."""
+    if not c.hasForm(HEADER_FORM):
+        c.beginForm(HEADER_FORM)
+        _draw_header(c)
+        c.endForm()
+        c.beginForm(FOOTER_FORM)
+        _draw_footer(c)
+        c.endForm()
+
+
+def draw_worksheet(c, rx, layers=True):
+    """Draw one patient's worksheet onto an A4 canvas c, starting on the current (blank) page.
+
+    With layers=False the static header/footer are drawn inline instead of stamped as forms.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+
+    pname, wt, category, visit, factor = rx.pname, rx.wt, rx.category, rx.visit, rx.factor
+    tdd, target, regimen, corr_type, cf = rx.tdd, rx.target, rx.regimen, rx.corr_type, rx.cf
+    d = rx.dose_map
+
+    w, h = A4
+    y = h - 2 * cm
+
+    # Header (title and regimen section title are static)
+    if layers:
+        _define_layers(c)
+        c.doForm(HEADER_FORM)
+    else:
+        _draw_header(c)
+    y -= 0.8 * cm
+    c.setFont("Helvetica", 10)
+    c.drawString(2 * cm, y, f"Patient: {pname or '—'}   Weight: {wt:.1f} kg   Category: {category}")
+    y -= 0.5 * cm
+    c.drawString(2 * cm, y, f"Visit: {visit}   Factor: {factor} U/kg   TDD: {tdd} U   Goal: ≤ {target} mg/dL")
+    y -= 0.7 * cm
+
+    # Regimen section
+    y -= 0.5 * cm
+    c.setFont("Helvetica", 10)
+    c.drawString(2 * cm, y, REGIMEN_BY_NAME[regimen].pdf.format(tdd=tdd, **d))
+    y -= 0.5 * cm
+
+    # Correction table header
+    y -= 0.2 * cm
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(2 * cm, y, f"Correction doses ({corr_type}; 1 U ≈ {cf:.0f} mg/dL; bins 40 mg/dL)")
+    y -= 0.5 * cm
+    c.setFont("Helvetica", 10)
+    # Render correction rows
+    for label, usual, hypo in rx.correction_rows:
+        if y < 2.5 * cm:
+            c.showPage()
+            y = h - 2 * cm
+            c.setFont("Helvetica", 10)
+        c.drawString(
+            2 * cm,
+            y,
+            f"{label}: Usual {usual} U | Hypo {hypo} U",
+        )
+        y -= 0.4 * cm
+
+    # Footer
+    if y < 2.5 * cm:
+        c.showPage()
+        y = h - 2 * cm
+    if layers:
+        c.doForm(FOOTER_FORM)
+    else:
+        _draw_footer(c)
+
+
+def build_pdf_summary(rx, layers=False):
+    """Return the worksheet summary PDF for a Prescription as bytes.
+
+    Drawn inline by default: forms cannot be shared across documents, so for a single
+    worksheet defining them only adds time and size. write_combined_pdf uses them.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    draw_worksheet(c, rx, layers)
+    c.save()
+    pdf = buf.getvalue()
+    buf.close()
+    return pdf
+
+
+def write_combined_pdf(prescriptions, path, progress=None, layers=True):
+    """Write one PDF with a worksheet section per patient to path; returns the patient count.
+
+    Prescriptions are consumed one at a time and each finished page is compressed as it
+    is closed, so memory stays small for long ward lists. (reportlab keeps the compressed
+    pages until save(); it has no page-by-page file output.)
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+    count = 0
+    for count, rx in enumerate(prescriptions, 1):
+        draw_worksheet(c, rx, layers)
+        c.showPage()
+        if progress:
+            progress(count)
+    c.save()
+    return count
+
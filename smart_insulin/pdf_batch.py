@@ -0,0 +1,121 @@
+# SMART Insulin Worksheet — batch PDF rendering
+# Renders the worksheet PDF for every patient in a roster CSV across a process pool,
+# writing each PDF to a directory (or into one ZIP) as soon as it is ready.
+#
+#   python -m smart_insulin.pdf_batch roster.csv worksheets/ --workers 8
+#   python -m smart_insulin.pdf_batch roster.csv worksheets.zip --zip
+#   python -m smart_insulin.pdf_batch roster.csv ward_round.pdf --combined
+
+import argparse
+import csv
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .pdf import build_pdf_summary, write_combined_pdf
+from .prescription import prescription_from_record
+
+
+def iter_prescriptions(fh):
+    """Yield Prescriptions from an open roster CSV (text mode), one row at a time."""
+    for row, rec in enumerate(csv.DictReader(fh), 1):
+        yield prescription_from_record(rec, row)
+
+
+def read_roster(path):
+    """Yield Prescriptions from a roster CSV file path."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        yield from iter_prescriptions(fh)
+
+
+def pdf_filename(index, rx):
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", rx.pname).strip("_") or "patient"
+    return f"{index:05d}_insulin_worksheet_{safe}.pdf"
+
+
+def render_many(prescriptions, workers=None, window=None, mp_context=None, threads=False):
+    """Yield (index, rx, pdf bytes) in input order, rendering across a process pool.
+
+    At most `window` renders are in flight, so the roster is never fully materialized.
+    Pass mp_context=multiprocessing.get_context("spawn") from threaded servers. Inside a
+    Streamlit script use threads=True instead: spawned workers would re-run the page.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    if threads:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+    with executor as pool:
+        pending = deque()
+        for index, rx in enumerate(prescriptions, 1):
+            pending.append((index, rx, pool.submit(build_pdf_summary, rx)))
+            if len(pending) >= window:
+                index, rx, fut = pending.popleft()
+                yield index, rx, fut.result()
+        while pending:
+            index, rx, fut = pending.popleft()
+            yield index, rx, fut.result()
+
+
+def write_zip(prescriptions, out, workers=None, progress=None, mp_context=None, threads=False):
+    """Stream PDFs into a ZIP (path or binary file object) as they are rendered.
+
+    Each PDF is written and released as soon as it arrives, so memory holds at most
+    the in-flight window, never the whole batch. Returns the count.
+    """
+    count = 0
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for index, rx, pdf in render_many(prescriptions, workers, mp_context=mp_context, threads=threads):
+            zf.writestr(pdf_filename(index, rx), pdf)
+            count = index
+            if progress:
+                progress(count)
+    return count
+
+
+def render_roster(roster, out, as_zip=False, workers=None, progress=None):
+    """Render every roster patient to out (directory, or ZIP path when as_zip). Returns the count."""
+    count = 0
+    if as_zip:
+        count = write_zip(read_roster(roster), out, workers, progress)
+    else:
+        os.makedirs(out, exist_ok=True)
+        for index, rx, pdf in render_many(read_roster(roster), workers):
+            with open(os.path.join(out, pdf_filename(index, rx)), "wb") as fh:
+                fh.write(pdf)
+            count = index
+            if progress:
+                progress(count)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render worksheet PDFs for a whole roster")
+    parser.add_argument("roster", help="roster CSV (same columns as smart_insulin.cli)")
+    parser.add_argument("out", help="output directory, ZIP file with --zip, or PDF file with --combined")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--zip", action="store_true", help="write a single ZIP instead of a directory")
+    group.add_argument("--combined", action="store_true", help="write one PDF with a section per patient")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    def progress(n):
+        if n % 50 == 0:
+            print(f"{n} worksheets", file=sys.stderr)
+
+    try:
+        if args.combined:
+            total = write_combined_pdf(read_roster(args.roster), args.out, progress)
+        else:
+            total = render_roster(args.roster, args.out, args.zip, args.workers, progress)
+    except (KeyError, ValueError) as exc:
+        parser.exit(1, f"error: {exc}\n")
+    print(f"done: {total} worksheets", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# SMART Insulin Worksheet — on-disk PDF cache
+# Content-addressed: the file name is a SHA-256 of the normalized prescription inputs
+# plus PROTOCOL_VERSION, so identical inputs always map to the same PDF and a protocol
+# or layout change invalidates everything. Total size is bounded; least recently used
+# files are evicted first (mtime is touched on every hit).
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from .dosing import PROTOCOL_VERSION
+
+ESCALATION_VISITS = ("Inadequate control (with previous TDD)", "Hypoglycemia (with previous TDD)")
+
+
+def pdf_cache_key(rx):
+    """Hex digest identifying the PDF for a Prescription's inputs."""
+    normalized = {
+        "protocol": PROTOCOL_VERSION,
+        "pname": rx.pname,
+        "wt": float(rx.wt),
+        "category": rx.category,
+        "factor": float(rx.factor),
+        "visit": rx.visit,
+        "prev_tdd": None if rx.prev_tdd is None else float(rx.prev_tdd),
+        "regimen": rx.regimen,
+        # the step only changes the result for escalation / de-escalation visits
+        "step": int(rx.step) if rx.visit in ESCALATION_VISITS else None,
+        "corr_type": rx.corr_type,
+    }
+    blob = json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class DiskPDFCache:
+    """Size-bounded directory of rendered PDFs keyed by pdf_cache_key."""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)  # worksheets carry patient names
+        # Running totals so stats() (scraped by Prometheus) never walks the directory
+        self._count = 0
+        self._total = 0
+        for _, size, _ in self._files():
+            self._count += 1
+            self._total += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pdf")
+
+    def _files(self):
+        """(path, size, mtime) for every cached PDF."""
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".pdf"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def get(self, rx):
+        path = self._path(pdf_cache_key(rx))
+        try:
+            with open(path, "rb") as fh:
+                pdf = fh.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return pdf
+
+    def put(self, rx, pdf):
+        path = self._path(pdf_cache_key(rx))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(pdf)
+        with self._lock:  # stat + replace + accounting together, so concurrent puts keep totals right
+            try:
+                old_size = os.stat(path).st_size
+            except FileNotFoundError:
+                old_size = None
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+            if old_size is None:
+                self._count += 1
+                self._total += len(pdf)
+            else:
+                self._total += len(pdf) - old_size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Oldest first until back under 90% of the bound (caller holds the lock)
+        for path, size, _ in sorted(self._files(), key=lambda f: f[2]):
+            if self._total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._count -= 1
+            self._total -= size
+            self.evictions += 1
+
+    def get_or_render(self, rx, render):
+        """Cached PDF bytes for rx, rendering (and storing) them on a miss."""
+        pdf = self.get(rx)
+        if pdf is None:
+            pdf = render(rx)
+            self.put(rx, pdf)
+        return pdf
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": self._count,
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,119 @@
+# SMART Insulin Worksheet — prescription result
+# One immutable object per input set holding everything the worksheet shows:
+# TDD, regimen splits, correction factor and correction rows. The UI, the PDF and
+# the exporters all read from it, so the arithmetic happens once and cannot disagree.
+# Doses are stored as integer half-units (exact, hashable); tdd / dose_map give units.
+
+from collections import namedtuple
+
+from .dosing import CORRECTION_TYPES, compute_tdd_half, from_half_units, regimen_doses_half, target_for
+from .tables import lookup_correction_table_half
+from .validation import check_entry, check_prescription
+
+USUAL_COL = "Usual (≤130) U"
+HYPO_COL = "Hypo-concern (≤140) U"
+
+# namedtuple rather than a dataclass: importing dataclasses (and inspect) would triple the
+# package's cold-import time.
+_PrescriptionFields = namedtuple(
+    "Prescription",
+    (
+        # Entry
+        "pname wt category factor visit prev_tdd regimen step corr_type "
+        # Computed: tdd_half (int), doses ((name, half-units), ...) in regimen order,
+        # correction_rows ((label, usual U, hypo U), ...)
+        "tdd_half adj_note target doses cf correction_rows"
+    ),
+)
+
+
+class Prescription(_PrescriptionFields):
+    __slots__ = ()
+
+    @property
+    def tdd(self):
+        return from_half_units(self.tdd_half)
+
+    @property
+    def dose_map(self):
+        """{dose name: units} in regimen order."""
+        return {name: from_half_units(half) for name, half in self.doses}
+
+    def correction_records(self):
+        """Correction rows as dicts with the worksheet column headers."""
+        return [
+            {"Pre-meal (mg/dL)": label, USUAL_COL: usual, HYPO_COL: hypo}
+            for label, usual, hypo in self.correction_rows
+        ]
+
+
+def build_prescription(pname, wt, category, factor, visit, prev_tdd, regimen, step=15, corr_type=CORRECTION_TYPES[0]):
+    """Compute the full prescription for one entry.
+
+    ValueError if a field is outside the entry form's limits/choices or the TDD rounds to 0 U.
+    """
+    wt, factor, visit, prev_tdd, step = check_entry(wt, factor, visit, prev_tdd, step)
+    category, regimen, corr_type = check_prescription(category, regimen, corr_type)
+    tdd_half, adj_note = compute_tdd_half(wt, factor, visit, prev_tdd, step)
+    if tdd_half < 1:
+        raise ValueError("TDD rounds to 0 U; check the weight and previous TDD")
+    target = target_for(category)
+    cf, rows = lookup_correction_table_half(tdd_half, corr_type, target)
+    return Prescription(
+        pname=pname,
+        wt=wt,
+        category=category,
+        factor=factor,
+        visit=visit,
+        prev_tdd=prev_tdd,
+        regimen=regimen,
+        step=step,
+        corr_type=corr_type,
+        tdd_half=tdd_half,
+        adj_note=adj_note,
+        target=target,
+        doses=tuple(regimen_doses_half(regimen, wt, tdd_half).items()),
+        cf=cf,
+        correction_rows=tuple((r["Pre-meal (mg/dL)"], r[USUAL_COL], r[HYPO_COL]) for r in rows),
+    )
+
+
+def _record_field(rec, key, default=None):
+    value = (rec.get(key) or "").strip()
+    if value:
+        return value
+    if default is None:
+        raise ValueError(f"missing field: {key}")
+    return default
+
+
+def _record_number(rec, key, default=None):
+    value = _record_field(rec, key, default)
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a number") from None
+
+
+def prescription_from_record(rec, row=None):
+    """Prescription from a roster CSV row (string fields as in smart_insulin.cli).
+
+    Fields are checked like the entry form's; the ValueError names the row (or the patient).
+    """
+    name = rec.get("name") or ""
+    try:
+        prev_tdd = _record_field(rec, "prev_tdd", "")
+        return build_prescription(
+            name,
+            _record_number(rec, "weight"),
+            _record_field(rec, "category"),
+            _record_number(rec, "factor"),
+            _record_field(rec, "visit"),
+            _record_number(rec, "prev_tdd") if prev_tdd else None,
+            _record_field(rec, "regimen"),
+            _record_number(rec, "step", "15"),
+            _record_field(rec, "correction_type", CORRECTION_TYPES[0]),
+        )
+    except ValueError as exc:
+        where = f"row {row}" if row is not None else "record"
+        raise ValueError(f"{where} ({name or 'unnamed'}): {exc}") from None
@@ -0,0 +1,69 @@
+# SMART Insulin Worksheet — regimen table
+# Every regimen is data: its doses (basis × num / div, rounded to 0.5 U) and the text
+# shown on screen and in the PDF. dosing.regimen_doses evaluates it for one patient,
+# batch.regimen_doses_batch for whole arrays; adding a regimen means adding a row here.
+
+from collections import namedtuple
+
+# value = (weight or TDD) × num / div — an exact integer fraction (e.g. 2/3, 3/10) so the
+# split is computed in half-units without float error
+Dose = namedtuple("Dose", "name basis num div")
+
+
+# doses: Dose rows; screen: markdown lines, formatted with tdd= and the dose names;
+# pdf: one PDF line, same placeholders. (namedtuple, not a dataclass: keeps dataclasses /
+# inspect out of the package import.)
+Regimen = namedtuple("Regimen", "name doses screen pdf caption", defaults=("",))
+
+
+REGIMEN_TABLE = (
+    Regimen(
+        "Basal",
+        (Dose("basal_low", "wt", 1, 10), Dose("basal_high", "wt", 1, 5)),
+        (
+            "**Basal (long-acting)**: start **10 U** _or_ **0.1–0.2 U/kg** after dinner",
+            "Weight-based range: **{basal_low}–{basal_high} U**",
+        ),
+        "Basal (long-acting): 10 U or 0.1–0.2 U/kg after dinner (range {basal_low}–{basal_high} U)",
+        caption="Titrate ↑2 U every 3 days if fasting >130 mg/dL (or >140 mg/dL if hypoglycemia concern).",
+    ),
+    Regimen(
+        "Basal plus (one prandial)",
+        (Dose("basal_low", "wt", 1, 10), Dose("basal_high", "wt", 1, 5), Dose("prandial", "wt", 1, 10)),
+        (
+            "**Basal:** 10 U or 0.1–0.2 U/kg at bedtime; **One prandial:** 0.1 U/kg before largest meal",
+            "Basal range: **{basal_low}–{basal_high} U** | One prandial: **{prandial} U**",
+        ),
+        "Basal 0.1–0.2 U/kg; One prandial 0.1 U/kg → {prandial} U before largest meal",
+    ),
+    Regimen(
+        "Premixed — twice a day",
+        (Dose("breakfast", "tdd", 2, 3), Dose("supper", "tdd", 1, 3)),
+        ("**Premix TDD = {tdd} U** → **2/3 breakfast:** {breakfast} U, **1/3 supper:** {supper} U",),
+        "Premix TDD {tdd} U → Breakfast (2/3): {breakfast} U; Supper (1/3): {supper} U",
+    ),
+    Regimen(
+        "Premixed — three times a day",
+        (Dose("breakfast", "tdd", 2, 5), Dose("lunch", "tdd", 3, 10), Dose("dinner", "tdd", 3, 10)),
+        (
+            "**Premix TDD = {tdd} U** → **40% breakfast:** {breakfast} U, "
+            "**30% lunch:** {lunch} U, **30% dinner:** {dinner} U",
+        ),
+        "Premix TDD {tdd} U → 40% BF: {breakfast} U; 30% L: {lunch} U; 30% D: {dinner} U",
+    ),
+    Regimen(
+        "Basal bolus",
+        (Dose("basal", "tdd", 1, 2), Dose("bolus_total", "tdd", 1, 2), Dose("bolus_per_meal", "tdd", 1, 6)),
+        (
+            "**Basal-bolus TDD = {tdd} U** → **Basal 50%:** {basal} U; **Bolus total 50%:** {bolus_total} U",
+            "≈ **{bolus_per_meal} U** before each meal",
+        ),
+        "Basal-bolus TDD {tdd} U → Basal 50%: {basal} U; Bolus total 50%: {bolus_total} U (~{bolus_per_meal} U each)",
+    ),
+)
+
+REGIMENS = tuple(r.name for r in REGIMEN_TABLE)
+REGIMEN_BY_NAME = {r.name: r for r in REGIMEN_TABLE}
+
+# Every dose name across regimens, in first-seen order (batch output columns)
+DOSE_NAMES = tuple(dict.fromkeys(d.name for r in REGIMEN_TABLE for d in r.doses))
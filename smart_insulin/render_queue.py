@@ -0,0 +1,78 @@
+# SMART Insulin Worksheet — bounded background render queue
+# PDF renders run on a small worker pool instead of the Streamlit script thread.
+# Concurrency (workers) and queue depth (max_pending) are fixed; when both are used up
+# submit() raises QueueFull so bursts are shed instead of piling up behind each other.
+# Speculative (background) renders never take the last `reserved` slots, which are kept
+# for renders a user explicitly asked for.
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class RenderQueue:
+    def __init__(self, workers=2, max_pending=16, max_failures=64, reserved=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        # default: a quarter of all slots (at least one) is kept for interactive submits
+        self.reserved = max(1, (workers + max_pending) // 4) if reserved is None else reserved
+        self.max_failures = max_failures
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-render")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._jobs = {}  # key -> Future (queued or running)
+        # key -> error message of the last attempt; only the newest max_failures are kept, and
+        # as text, so a failure does not pin the exception's traceback frames
+        self._failed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, background=False):
+        """Queue fn() under key (no-op if already queued). Raises QueueFull when saturated.
+
+        background=True is for speculative work: it is refused (QueueFull) unless more than
+        `reserved` slots are free, so it cannot crowd out interactive submits.
+        """
+        with self._lock:
+            fut = self._jobs.get(key)
+            if fut is not None:
+                return fut
+            if background and len(self._jobs) + self.reserved >= self.workers + self.max_pending:
+                raise QueueFull(f"no spare render capacity ({self.reserved} slots reserved for explicit requests)")
+            if not self._slots.acquire(blocking=False):
+                raise QueueFull(f"render queue full ({self.workers} running, {self.max_pending} queued)")
+            self._failed.pop(key, None)
+            fut = self._jobs[key] = self._pool.submit(fn)
+        fut.add_done_callback(lambda f: self._finish(key, f))
+        return fut
+
+    def _finish(self, key, fut):
+        with self._lock:
+            self._jobs.pop(key, None)
+            exc = None if fut.cancelled() else fut.exception()
+            if exc is not None:
+                self._failed[key] = f"{type(exc).__name__}: {exc}"
+                self._failed.move_to_end(key)
+                while len(self._failed) > self.max_failures:
+                    self._failed.popitem(last=False)
+        self._slots.release()
+
+    def state(self, key):
+        """'queued', 'running', 'failed' or None (never submitted, or finished — read the cache)."""
+        with self._lock:
+            fut = self._jobs.get(key)
+            if fut is not None:
+                return "running" if fut.running() else "queued"
+            return "failed" if key in self._failed else None
+
+    def error(self, key):
+        """Error message of key's last failed render, or None."""
+        with self._lock:
+            return self._failed.get(key)
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for f in self._jobs.values() if f.running())
+            return {"running": running, "queued": len(self._jobs) - running, "failed": len(self._failed)}
@@ -0,0 +1,79 @@
+# SMART Insulin Worksheet — precomputed correction tables
+# TDD is carried in integer half-units and bounded by the entry form
+# (300 U previous TDD × 1.2 escalation = 360 U), so every worksheet correction table for
+# both insulin types and both targets is built once per process into one int16 array.
+# Producing a table is then an O(1) index instead of a ceil() loop per rerun.
+
+import threading
+from array import array
+
+from .dosing import (
+    BINS_40,
+    CORRECTION_TYPES,
+    correction_factor,
+    correction_table,
+    correction_units,
+    from_half_units,
+    to_half_units,
+)
+
+MAX_TDD = 360.0
+TARGETS = (130, 140)
+
+_HALF_UNITS = int(MAX_TDD * 2)  # TDD 0.5 … MAX_TDD in 0.5 U steps
+_N_ROWS = len(BINS_40) + 1  # bins + ">330" row
+_LABELS = tuple(f"{lo}-{hi}" for lo, hi in BINS_40) + (f">{BINS_40[-1][1]}",)
+
+_lock = threading.Lock()
+_usual = None  # array("h"): "Usual" column; "Hypo-concern" is always max(0, usual - 1)
+
+
+def _offset(type_i, target_i, half):
+    return ((type_i * len(TARGETS) + target_i) * _HALF_UNITS + (half - 1)) * _N_ROWS
+
+
+def _build():
+    usual = array("h", bytes(2 * len(CORRECTION_TYPES) * len(TARGETS) * _HALF_UNITS * _N_ROWS))
+    for type_i, corr_type in enumerate(CORRECTION_TYPES):
+        for target_i, target in enumerate(TARGETS):
+            for half in range(1, _HALF_UNITS + 1):
+                base = _offset(type_i, target_i, half)
+                usual[base : base + _N_ROWS] = array("h", correction_units(half, corr_type, target))
+    return usual
+
+
+def warm_correction_tables():
+    """Build the lookup array now (call once at process start)."""
+    global _usual
+    if _usual is None:
+        with _lock:
+            if _usual is None:
+                _usual = _build()
+    return _usual
+
+
+def lookup_correction_table_half(tdd_half, corr_type, target, bins=BINS_40):
+    """lookup_correction_table for a TDD already in integer half-units."""
+    if bins is not BINS_40 or target not in TARGETS or not 1 <= tdd_half <= _HALF_UNITS:
+        return correction_table(from_half_units(tdd_half), corr_type, target, bins)
+    usual = warm_correction_tables()
+    type_i = 0 if "Rapid" in corr_type else 1
+    base = _offset(type_i, TARGETS.index(target), tdd_half)
+    rows = [
+        {
+            "Pre-meal (mg/dL)": label,
+            "Usual (≤130) U": usual[base + i],
+            "Hypo-concern (≤140) U": max(0, usual[base + i] - 1),
+        }
+        for i, label in enumerate(_LABELS)
+    ]
+    return correction_factor(from_half_units(tdd_half), corr_type), rows
+
+
+def lookup_correction_table(tdd, corr_type, target, bins=BINS_40):
+    """Same result as dosing.correction_table, served from the precomputed array.
+
+    tdd is taken on the 0.5 U grid; falls back to computing the table when it is out of
+    range, or when the target / bins are not the worksheet ones.
+    """
+    return lookup_correction_table_half(to_half_units(tdd), corr_type, target, bins)
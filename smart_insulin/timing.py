@@ -0,0 +1,164 @@
+# SMART Insulin Worksheet — per-stage timing
+# Fixed-bucket latency histograms per stage with p50/p95/p99 estimates.
+# Off unless SMART_INSULIN_TIMING=1: stage() then returns a shared no-op context,
+# timed() returns the function unchanged and laps() a no-op, so the cost is ~nil.
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+ENABLED = os.environ.get("SMART_INSULIN_TIMING", "") not in ("", "0")
+
+# Upper bucket bounds in ms (last bucket is +inf)
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+
+class Histogram:
+    """Per-bucket counts plus count/sum; constant memory."""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        """Estimate the q-quantile (0-1) by linear interpolation inside the bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return lower
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.sum / self.count if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+        }
+
+
+_lock = threading.Lock()
+_stages = {}  # name -> Histogram
+
+
+def record(name, ms):
+    with _lock:
+        hist = _stages.get(name)
+        if hist is None:
+            hist = _stages[name] = Histogram()
+        hist.observe(ms)
+
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+_NOOP = nullcontext()
+
+
+def stage(name):
+    """Context manager timing one stage (no-op when timing is disabled)."""
+    return _Stage(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator form of stage(); leaves the function untouched when disabled."""
+    def deco(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+class Laps:
+    """Sequential timer: each mark(name) records the time since the previous mark."""
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, name):
+        now = time.perf_counter()
+        record(name, (now - self.last) * 1000)
+        self.last = now
+
+    def total(self, name):
+        record(name, (time.perf_counter() - self.start) * 1000)
+
+
+class _NoLaps:
+    def mark(self, name):
+        pass
+
+    def total(self, name):
+        pass
+
+
+_NO_LAPS = _NoLaps()
+
+
+def laps():
+    return Laps() if ENABLED else _NO_LAPS
+
+
+def snapshot():
+    """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms}}"""
+    with _lock:
+        return {name: hist.snapshot() for name, hist in sorted(_stages.items())}
+
+
+def histograms():
+    """[(stage, bucket counts, sum in ms), ...] sorted by stage; copies, for exporters."""
+    with _lock:
+        return [(name, list(hist.counts), hist.sum) for name, hist in sorted(_stages.items())]
+
+
+def dump_json(path=None):
+    """Snapshot as JSON text; also written to path when given."""
+    text = json.dumps({"enabled": ENABLED, "stages": snapshot()}, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    return text
+
+
+def reset():
+    with _lock:
+        _stages.clear()
@@ -0,0 +1,53 @@
+# SMART Insulin Worksheet — entry validation
+# The entry form's limits and choices as checks, shared by everything that doses input
+# the form did not constrain: the JSON API, roster CSVs (cli, batch PDFs) and build_prescription.
+# Anything outside them raises ValueError instead of silently taking a default branch.
+
+from .dosing import CATEGORIES, CORRECTION_TYPES, STEPS, VISIT_TYPES
+from .regimens import REGIMENS
+
+# (min, max) of the entry form's number inputs
+WEIGHT_RANGE = (20.0, 300.0)
+FACTOR_RANGE = (0.1, 0.6)
+PREV_TDD_RANGE = (0.0, 300.0)
+
+
+def check_number(value, key, lo, hi):
+    """value as a float within [lo, hi] (NaN and ±inf are rejected)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    if not lo <= value <= hi:
+        raise ValueError(f"{key} must be between {lo} and {hi}")
+    return float(value)
+
+
+def check_choice(value, key, choices):
+    """value if it is one of choices (exact match, as the form's select boxes)."""
+    if value not in choices:
+        raise ValueError(f"{key} must be one of: {', '.join(map(str, choices))}")
+    return value
+
+
+def check_entry(wt, factor, visit, prev_tdd, step):
+    """Validated (wt, factor, visit, prev_tdd, step) for the TDD; prev_tdd is dropped for an initial visit."""
+    visit = check_choice(visit, "visit", VISIT_TYPES)
+    if visit == VISIT_TYPES[0]:
+        prev_tdd = None
+    elif prev_tdd is not None:
+        prev_tdd = check_number(prev_tdd, "prev_tdd", *PREV_TDD_RANGE)
+    return (
+        check_number(wt, "weight", *WEIGHT_RANGE),
+        check_number(factor, "factor", *FACTOR_RANGE),
+        visit,
+        prev_tdd,
+        int(check_choice(step, "step", STEPS)),
+    )
+
+
+def check_prescription(category, regimen, corr_type):
+    """Validated (category, regimen, corr_type) for the worksheet."""
+    return (
+        check_choice(category, "category", CATEGORIES),
+        check_choice(regimen, "regimen", REGIMENS),
+        check_choice(corr_type, "correction_type", CORRECTION_TYPES),
+    )
@@ -0,0 +1,105 @@
+# SMART Insulin Worksheet — NDJSON streaming endpoint tests
+#
+#   python -m unittest discover -s tests
+
+import json
+import unittest
+
+try:
+    from aiohttp.test_utils import TestClient, TestServer
+except ImportError:  # API tests are skipped without aiohttp
+    TestClient = None
+
+from smart_insulin import VISIT_TYPES
+
+BODY = {"name": "A", "weight": 70, "category": "Usual", "factor": 0.3, "visit": VISIT_TYPES[0], "regimen": "Basal"}
+
+
+def _line(name):
+    return json.dumps(dict(BODY, name=name)).encode() + b"\n"
+
+
+class _Chunks:
+    """Stand-in for aiohttp's StreamReader: readany() returns the given chunks, then b""."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def readany(self):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+@unittest.skipIf(TestClient is None, "aiohttp not installed")
+class IterLinesTest(unittest.IsolatedAsyncioTestCase):
+    async def lines(self, chunks, limit=8):
+        from smart_insulin.api import _iter_lines
+
+        return [line async for line in _iter_lines(_Chunks(chunks), limit)]
+
+    async def test_line_spanning_chunks(self):
+        self.assertEqual(await self.lines([b"ab", b"c\nd", b"e\n"]), [b"abc\n", b"de\n"])
+
+    async def test_oversized_line_is_skipped_through_its_newline(self):
+        chunks = [b"ok\n", b"0123456", b"789", b"abc\nnext\n"]
+        self.assertEqual(await self.lines(chunks), [b"ok\n", None, b"next\n"])
+
+    async def test_oversized_line_inside_one_chunk(self):
+        self.assertEqual(await self.lines([b"0123456789\nok\n"]), [None, b"ok\n"])
+
+    async def test_final_line_without_newline(self):
+        self.assertEqual(await self.lines([b"ok\nlast"]), [b"ok\n", b"last"])
+        self.assertEqual(await self.lines([b"ok\n0123", b"456789"]), [b"ok\n", None])
+
+
+@unittest.skipIf(TestClient is None, "aiohttp not installed")
+class StreamEndpointTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        from smart_insulin.api import STREAM_MAX_LINE_BYTES, create_app
+
+        self.too_long = b'{"name": "' + b"x" * STREAM_MAX_LINE_BYTES + b'"}'
+        self.client = TestClient(TestServer(create_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def stream(self, chunks):
+        async def body():
+            for chunk in chunks:
+                yield chunk
+
+        resp = await self.client.post("/prescriptions/stream", data=body())
+        self.assertEqual(resp.status, 200)
+        return [json.loads(line) for line in (await resp.text()).splitlines()]
+
+    async def test_errors_keep_line_numbers_and_order(self):
+        out = await self.stream(
+            [
+                _line("first"),
+                b"\n",  # blank lines are skipped but still counted
+                b"{not json\n",
+                self.too_long[:40_000],  # oversized line split across chunks
+                self.too_long[40_000:] + b"\n" + _line("after"),
+                b"   \n",
+                json.dumps(dict(BODY, category="usual")).encode() + b"\n",
+                _line("last"),
+            ]
+        )
+        self.assertEqual(out[0]["name"], "first")
+        self.assertEqual(out[1]["line"], 3)
+        self.assertIn("error", out[1])
+        self.assertEqual(out[2], {"line": 4, "error": "line too long"})
+        self.assertEqual(out[3]["name"], "after")
+        self.assertEqual(out[4]["line"], 7)
+        self.assertIn("category", out[4]["error"])
+        self.assertEqual(out[5]["name"], "last")
+        self.assertEqual(len(out), 6)
+
+    async def test_oversized_final_line(self):
+        out = await self.stream([_line("first"), self.too_long])
+        self.assertEqual(out, [out[0], {"line": 2, "error": "line too long"}])
+        self.assertEqual(out[0]["name"], "first")
+
+
+if __name__ == "__main__":
+    unittest.main()
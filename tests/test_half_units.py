@@ -0,0 +1,126 @@
+# SMART Insulin Worksheet — half-unit arithmetic regression tests
+#
+#   python -m unittest discover -s tests
+
+import itertools
+import unittest
+
+from smart_insulin import (
+    BINS_40,
+    CORRECTION_TYPES,
+    FACTORS,
+    REGIMENS,
+    STEPS,
+    VISIT_TYPES,
+    build_prescription,
+    compute_tdd,
+    compute_tdd_half,
+    correction_table,
+    lookup_correction_table,
+    regimen_doses,
+    regimen_doses_half,
+)
+
+try:
+    import numpy as np
+except ImportError:  # batch tests are skipped without numpy
+    np = None
+
+INITIAL, REPEAT, INADEQUATE, HYPO = VISIT_TYPES
+
+
+class TieRoundingTest(unittest.TestCase):
+    """Exact x.25 / x.75 results round half-to-even on the 0.5 U grid (float error used to decide)."""
+
+    def test_tdd_ties(self):
+        cases = [
+            ((70, 0.3, INADEQUATE, 165, 15), 190.0),  # 189.75 → 379.5 half-units → 380
+            ((70, 0.3, INADEQUATE, 27.5, 10), 30.0),  # 30.25 → 60.5 → 60
+            ((70, 0.3, HYPO, 32.5, 10), 29.0),  # 29.25 → 58.5 → 58
+            ((82.5, 0.3, INITIAL, None, 15), 25.0),  # 24.75 → 49.5 → 50
+            ((22.5, 0.5, INITIAL, None, 15), 11.0),  # 11.25 → 22.5 → 22
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                self.assertEqual(compute_tdd(*args)[0], expected)
+                self.assertEqual(compute_tdd_half(*args)[0], int(expected * 2))
+
+    def test_split_ties(self):
+        self.assertEqual(
+            regimen_doses("Premixed — three times a day", 70, 12.5), {"breakfast": 5.0, "lunch": 4.0, "dinner": 4.0}
+        )
+        self.assertEqual(regimen_doses("Basal", 72.5, 0), {"basal_low": 7.0, "basal_high": 14.5})
+
+    def test_float_and_half_unit_apis_agree(self):
+        for regimen, wt, half in itertools.product(REGIMENS, (20, 52.5, 70.3, 300), range(1, 721, 7)):
+            doses = regimen_doses(regimen, wt, half / 2)
+            self.assertEqual(doses, {k: v / 2 for k, v in regimen_doses_half(regimen, wt, half).items()})
+
+    def test_prescription_is_hashable(self):
+        rx = build_prescription("A", 70, "Usual", 0.3, INADEQUATE, 40, "Basal bolus")
+        same = build_prescription("A", 70, "Usual", 0.3, INADEQUATE, 40, "Basal bolus")
+        self.assertEqual(hash(rx), hash(same))
+        self.assertEqual(rx.tdd_half, 92)
+        self.assertEqual(rx.tdd, 46.0)
+
+
+class CorrectionTableTest(unittest.TestCase):
+    def test_lookup_matches_compute(self):
+        for half, corr_type, target in itertools.product(range(1, 721), CORRECTION_TYPES, (130, 140)):
+            tdd = half / 2
+            self.assertEqual(lookup_correction_table(tdd, corr_type, target), correction_table(tdd, corr_type, target))
+
+    def test_rows(self):
+        cf, rows = correction_table(42.0, CORRECTION_TYPES[0], 130)
+        self.assertAlmostEqual(cf, 1800 / 42)
+        self.assertEqual(len(rows), len(BINS_40) + 1)
+        self.assertEqual([r["Usual (≤130) U"] for r in rows], [1, 1, 2, 3, 4, 10])
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class BatchParityTest(unittest.TestCase):
+    """The vectorized engine returns exactly what the scalar engine does."""
+
+    def setUp(self):
+        rng = np.random.default_rng(25)
+        n = 20_000
+        self.wt = np.round(rng.uniform(20, 300, n) * 2) / 2
+        self.wt[::3] = np.round(rng.uniform(20, 300, n // 3 + 1), 1)
+        self.factor = rng.choice(FACTORS, n)
+        self.visit = rng.choice(VISIT_TYPES, n)
+        self.prev = np.round(rng.uniform(0, 300, n) * 4) / 4
+        self.prev[::5] = np.nan
+        self.step = rng.choice(STEPS, n)
+        self.regimen = rng.choice(REGIMENS, n)
+
+    def test_tdd_batch_equals_scalar(self):
+        from smart_insulin.batch import compute_tdd_batch, compute_tdd_batch_half
+
+        halves = compute_tdd_batch_half(self.wt, self.factor, self.visit, self.prev, self.step)
+        self.assertEqual(halves.dtype, np.int16)
+        for i in range(len(self.wt)):
+            prev = None if np.isnan(self.prev[i]) else float(self.prev[i])
+            args = (float(self.wt[i]), float(self.factor[i]), str(self.visit[i]), prev, int(self.step[i]))
+            self.assertEqual(int(halves[i]), compute_tdd_half(*args)[0], args)
+        np.testing.assert_array_equal(
+            compute_tdd_batch(self.wt, self.factor, self.visit, self.prev, self.step), halves / 2
+        )
+
+    def test_regimen_batch_equals_scalar(self):
+        from smart_insulin.batch import NOT_APPLICABLE, regimen_doses_batch, regimen_doses_batch_half
+
+        halves = np.arange(len(self.wt)) % 720 + 1
+        batch = regimen_doses_batch_half(self.regimen, self.wt, halves)
+        units = regimen_doses_batch(self.regimen, self.wt, halves / 2)
+        for i in range(len(self.wt)):
+            doses = regimen_doses_half(str(self.regimen[i]), float(self.wt[i]), int(halves[i]))
+            for name, values in batch.items():
+                self.assertEqual(int(values[i]), doses.get(name, NOT_APPLICABLE))
+                if name in doses:
+                    self.assertEqual(units[name][i], doses[name] / 2)
+                else:
+                    self.assertTrue(np.isnan(units[name][i]))
+
+
+if __name__ == "__main__":
+    unittest.main()
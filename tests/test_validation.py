@@ -0,0 +1,57 @@
+# SMART Insulin Worksheet — entry validation tests
+#
+#   python -m unittest discover -s tests
+
+import unittest
+
+from smart_insulin import VISIT_TYPES, build_prescription, compute_tdd
+from smart_insulin.prescription import prescription_from_record
+
+ROW = {
+    "name": "A",
+    "weight": "70",
+    "category": "Usual",
+    "factor": "0.3",
+    "visit": VISIT_TYPES[0],
+    "prev_tdd": "",
+    "regimen": "Basal bolus",
+}
+
+
+class RecordValidationTest(unittest.TestCase):
+    """Roster strings outside the entry form's choices/limits are rejected, not dosed."""
+
+    def test_valid_row(self):
+        rx = prescription_from_record(ROW, 1)
+        self.assertEqual((rx.tdd, rx.target, rx.step, rx.corr_type[:5]), (21.0, 130, 15, "Rapid"))
+
+    def test_bad_fields_name_the_row(self):
+        cases = [
+            ("visit", "initial prescription"),
+            ("category", "usual"),
+            ("regimen", "basal"),
+            ("correction_type", "rapid analogue"),
+            ("step", "12"),
+            ("weight", "7000"),
+            ("weight", "heavy"),
+            ("factor", ""),
+            ("prev_tdd", "nan"),
+            ("prev_tdd", "inf"),
+        ]
+        for key, value in cases:
+            with self.subTest(key=key, value=value):
+                rec = {**ROW, "visit": VISIT_TYPES[1], "prev_tdd": "40", key: value}
+                with self.assertRaisesRegex(ValueError, rf"^row 7 \(A\): .*{key}"):
+                    prescription_from_record(rec, 7)
+
+    def test_build_prescription_checks_choices(self):
+        with self.assertRaises(ValueError):
+            build_prescription("A", 70, "Usual", 0.3, VISIT_TYPES[3], 40, "Basal bolus", step=50)
+
+    def test_compute_tdd_rejects_unknown_visit(self):
+        with self.assertRaisesRegex(ValueError, "unknown visit type"):
+            compute_tdd(70, 0.3, "initial prescription", 40)
+
+
+if __name__ == "__main__":
+    unittest.main()